@@ -0,0 +1,90 @@
+# Shared render assets, created once and reused every frame instead of
+# allocating surfaces and rendering text on the hot render path.
+
+import pygame
+from functools import lru_cache
+from os.path import join
+from constants import *
+from engine import PALETTE
+import bundle
+
+
+@lru_cache(maxsize=None)
+def tile(color, size = CELL_SIZE):
+    """One pre-rendered cell sized tile per color, shared by every cell of that color"""
+    surface = pygame.Surface((size, size))
+    surface.fill(color)
+    return surface
+
+
+def tiles(size = CELL_SIZE):
+    """Tiles indexed by board color index (index 0 is the empty cell)"""
+    return [tile(BLACK, size)] + [tile(color, size) for color in PALETTE[1:]]
+
+
+@lru_cache(maxsize=None)
+def ghost_tile(color, size = CELL_SIZE):
+    """Outline of a cell for the ghost piece"""
+    surface = pygame.Surface((size, size))
+    surface.fill(BLACK)
+    inset = min(2, size // 8)
+    pygame.draw.rect(surface, color, surface.get_rect().inflate(-2 * inset, -2 * inset), 2 if size >= 16 else 1)
+    return surface
+
+
+def ghost_tiles(size = CELL_SIZE):
+    """Ghost tiles indexed by board color index"""
+    return [tile(BLACK, size)] + [ghost_tile(color, size) for color in PALETTE[1:]]
+
+
+@lru_cache(maxsize=None)
+def grid_overlay(columns = COLUMNS, rows = ROWS, cell_size = CELL_SIZE):
+    """
+    The grid lines baked into one surface, everything except the lines is transparent
+    so it can be blitted over the whole field or over a single cell
+    """
+    width, height = columns * cell_size, rows * cell_size
+    surface = pygame.Surface((width, height))
+    surface.fill((0, 255, 0))
+    surface.set_colorkey((0, 255, 0))
+
+    for col in range(1, columns):
+        x = col * cell_size
+        pygame.draw.line(surface, LINE_COLOR, (x, 0), (x, height), 1)
+    for row in range(1, rows):
+        y = row * cell_size
+        pygame.draw.line(surface, LINE_COLOR, (0, y), (width, y), 1)
+    return surface
+
+
+@lru_cache(maxsize=None)
+def font(size):
+    return pygame.font.Font(join('graphics', 'font.ttf'), size)
+
+
+@lru_cache(maxsize=None)
+def shape_sprites():
+    """
+    The preview image of every shape. Comes from the packed atlas (see bundle.py),
+    the separate PNGs are only decoded if the atlas is missing or out of date
+    """
+    if not bundle.is_stale():
+        try:
+            return bundle.load()
+        except (OSError, ValueError):
+            pass
+    return {shape: pygame.image.load(path).convert_alpha() for shape, path in bundle.sprite_paths().items()}
+
+
+class TextCache:
+    def __init__(self, font, maxsize = 128, color = 'white'):
+        """
+        keeps the last rendered (label, value) strings so font.render
+        only runs when a value actually changes
+        """
+        self.font = font
+        self.color = color
+        self.render = lru_cache(maxsize=maxsize)(self._render)
+
+    def _render(self, label, value):
+        return self.font.render(f'{label}: {value}', True, self.color)
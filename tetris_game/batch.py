@@ -0,0 +1,245 @@
+# Vectorized batch simulator: steps thousands of boards at once with NumPy.
+# Uses the same rules as engine.py (SRS wall kicks, locking, line clears, SCORE_DATA)
+# but every operation is done for all boards in one pass instead of one Game at a time.
+
+import numpy as np
+
+import srs
+from constants import COLUMNS, ROWS, TETROMINOS, SCORE_DATA, SPAWN_ROW
+from engine import SHAPES
+from randomizer import bag_permutations
+
+# Actions
+NOOP, LEFT, RIGHT, ROTATE, ROTATE_COUNTER, SOFT_DROP, HARD_DROP = range(7)
+NUM_ACTIONS = 7
+
+SCORE_TABLE = np.array([0] + [SCORE_DATA[lines] for lines in range(1, 5)], dtype=np.int64)
+
+
+def build_tables():
+    """
+    Turns the SRS tables from srs.py into arrays that can be indexed per board.
+    orientations: [shape, rotation_state, block, (x, y)]
+    kicks:        [shape, from_state, direction (0 = clockwise, 1 = counter), kick, (x, y)]
+    spawn:        [shape, (x, y)] pivot position relative to (columns // 2, 0)
+    """
+    orientations = np.zeros((len(SHAPES), 4, 4, 2), dtype=np.int32)
+    kicks = np.zeros((len(SHAPES), 4, 2, 5, 2), dtype=np.int32)
+    spawn = np.zeros((len(SHAPES), 2), dtype=np.int32)
+
+    for s, shape in enumerate(SHAPES):
+        pivot_x, pivot_y = TETROMINOS[shape]['shape'][0]
+        spawn[s] = pivot_x, pivot_y + SPAWN_ROW
+        orientations[s] = srs.ORIENTATIONS[shape]
+
+        for rotation_state in range(4):
+            for direction in (srs.CLOCKWISE, srs.COUNTER_CLOCKWISE):
+                # the O piece has no kicks, a (0, 0) kick with the same orientation does nothing
+                kick_data = list(srs.ROTATIONS[shape][rotation_state][direction][2]) or [(0, 0)]
+                # pad to 5 kicks by repeating the last one, trying it twice changes nothing
+                kick_data += [kick_data[-1]] * (5 - len(kick_data))
+                kicks[s, rotation_state, direction] = kick_data
+
+    return orientations, kicks, spawn
+
+
+ORIENTATIONS, KICKS, SPAWN = build_tables()
+
+
+class BatchEnv:
+    def __init__(self, num_boards, seed = None, columns = COLUMNS, rows = ROWS):
+        """
+        holds num_boards boards as one (num_boards, rows, columns) uint8 array of color
+        indices (0 = empty, shape index + 1 otherwise) plus the falling piece of every board
+        """
+        self.num_boards = num_boards
+        self.columns = columns
+        self.height = rows
+        self.rng = np.random.default_rng(seed)
+
+        self.boards = np.zeros((num_boards, rows, columns), dtype=np.uint8)
+        self.shape = np.zeros(num_boards, dtype=np.int64)
+        self.x = np.zeros(num_boards, dtype=np.int64)
+        self.y = np.zeros(num_boards, dtype=np.int64)
+        self.rotation_state = np.zeros(num_boards, dtype=np.int64)
+
+        self.score = np.zeros(num_boards, dtype=np.int64)
+        self.lines = np.zeros(num_boards, dtype=np.int64)
+        self.level = np.ones(num_boards, dtype=np.int64)
+        self.pieces = np.zeros(num_boards, dtype=np.int64)
+        self.done = np.zeros(num_boards, dtype=bool)
+
+        # 7-bag randomizer per board
+        self.bags = np.zeros((num_boards, len(SHAPES)), dtype=np.int64)
+        self.bag_pos = np.full(num_boards, len(SHAPES), dtype=np.int64)
+
+        self._all = np.arange(num_boards)
+        self.reset()
+
+    def reset(self, indices = None):
+        """Clears the given boards (all of them by default) and spawns a new piece on each"""
+        idx = self._all if indices is None else np.asarray(indices, dtype=np.int64)
+        if idx.dtype == bool:
+            idx = np.flatnonzero(idx)
+
+        self.boards[idx] = 0
+        self.score[idx] = 0
+        self.lines[idx] = 0
+        self.level[idx] = 1
+        self.pieces[idx] = 0
+        self.done[idx] = False
+        self.bag_pos[idx] = len(SHAPES)
+        self._spawn(idx)
+        return self.observe()
+
+    def observe(self):
+        """
+        The boards array itself, not a copy. It is updated in place by step(),
+        copy it if you need to keep an older observation around.
+        """
+        return self.boards
+
+    def _next_shapes(self, idx):
+        refill = idx[self.bag_pos[idx] >= len(SHAPES)]
+        if len(refill):
+            self.bags[refill] = bag_permutations(self.rng, len(refill))
+            self.bag_pos[refill] = 0
+        shapes = self.bags[idx, self.bag_pos[idx]]
+        self.bag_pos[idx] += 1
+        return shapes
+
+    def _spawn(self, idx):
+        if not len(idx):
+            return
+        shapes = self._next_shapes(idx)
+        self.shape[idx] = shapes
+        self.x[idx] = self.columns // 2 + SPAWN[shapes, 0]
+        self.y[idx] = SPAWN[shapes, 1]
+        self.rotation_state[idx] = 0
+        blocked = self._collides(idx, self.x[idx], self.y[idx], self.rotation_state[idx])
+        self.done[idx[blocked]] = True
+
+    def _collides(self, idx, x, y, rotation_state):
+        """For every board in idx, does its piece collide at (x, y, rotation_state)"""
+        blocks = ORIENTATIONS[self.shape[idx], rotation_state]  # (n, 4, 2)
+        cx = blocks[:, :, 0] + x[:, None]
+        cy = blocks[:, :, 1] + y[:, None]
+
+        outside = (cx < 0) | (cx >= self.columns) | (cy >= self.height)
+        # cells above the field are free
+        on_board = ~outside & (cy >= 0)
+        occupied = self.boards[idx[:, None], np.clip(cy, 0, self.height - 1), np.clip(cx, 0, self.columns - 1)] != 0
+        return (outside | (on_board & occupied)).any(axis=1)
+
+    def _move_horizontal(self, idx, amount):
+        if not len(idx):
+            return
+        new_x = self.x[idx] + amount
+        ok = ~self._collides(idx, new_x, self.y[idx], self.rotation_state[idx])
+        self.x[idx[ok]] = new_x[ok]
+
+    def _rotate(self, idx, direction):
+        if not len(idx):
+            return
+        from_state = self.rotation_state[idx]
+        to_state = (from_state + (1 if direction == 0 else -1)) % 4
+        kicks = KICKS[self.shape[idx], from_state, direction]  # (n, 5, 2)
+
+        # test all kicks for all boards, then take the first valid one per board
+        valid = np.stack([
+            ~self._collides(idx, self.x[idx] + kicks[:, k, 0], self.y[idx] + kicks[:, k, 1], to_state)
+            for k in range(kicks.shape[1])
+        ], axis=1)
+        ok = valid.any(axis=1)
+        first = valid.argmax(axis=1)
+
+        rows = np.flatnonzero(ok)
+        boards = idx[rows]
+        self.x[boards] += kicks[rows, first[rows], 0]
+        self.y[boards] += kicks[rows, first[rows], 1]
+        self.rotation_state[boards] = to_state[rows]
+
+    def _move_down(self, idx):
+        """Moves the pieces down by one, returns the boards in idx whose piece is resting on something"""
+        if not len(idx):
+            return idx
+        new_y = self.y[idx] + 1
+        blocked = self._collides(idx, self.x[idx], new_y, self.rotation_state[idx])
+        moving = idx[~blocked]
+        self.y[moving] += 1
+        return idx[blocked]
+
+    def _lock(self, idx):
+        """Locks the pieces of the boards in idx, clears lines, scores and spawns the next pieces"""
+        if not len(idx):
+            return
+        self.pieces[idx] += 1
+        blocks = ORIENTATIONS[self.shape[idx], self.rotation_state[idx]]
+        cx = blocks[:, :, 0] + self.x[idx, None]
+        cy = blocks[:, :, 1] + self.y[idx, None]
+
+        # piece locked above the visible field
+        topped_out = (cy < 0).any(axis=1)
+        self.done[idx[topped_out]] = True
+        keep = ~topped_out
+        idx, cx, cy = idx[keep], cx[keep], cy[keep]
+        if not len(idx):
+            return
+        self.boards[idx[:, None], cy, cx] = (self.shape[idx] + 1)[:, None]
+
+        # line clears: move the full rows to the top (stable, so the rest keeps its order) and empty them
+        boards = self.boards[idx]
+        full = (boards != 0).all(axis=2)
+        cleared = full.sum(axis=1)
+        clearing = cleared > 0
+        if clearing.any():
+            order = np.argsort(~full[clearing], axis=1, kind='stable')
+            compacted = np.take_along_axis(boards[clearing], order[:, :, None], axis=1)
+            compacted[np.arange(self.height)[None, :] < cleared[clearing, None]] = 0
+            self.boards[idx[clearing]] = compacted
+
+            scoring = idx[clearing]
+            num_lines = cleared[clearing]
+            self.lines[scoring] += num_lines
+            self.score[scoring] += SCORE_TABLE[num_lines] * self.level[scoring]
+            self.level[scoring] += self.lines[scoring] / 10 > self.level[scoring]
+
+        self._spawn(idx)
+
+    def step(self, actions):
+        """
+        Applies one action per board, then one step of gravity.
+        Returns (boards, rewards, done) where boards is the live array from observe()
+        and rewards is the score gained this step. Finished boards ignore their actions
+        until they are reset().
+        """
+        actions = np.asarray(actions)
+        score_before = self.score.copy()
+        active = ~self.done
+
+        self._move_horizontal(np.flatnonzero(active & (actions == LEFT)), -1)
+        self._move_horizontal(np.flatnonzero(active & (actions == RIGHT)), 1)
+        self._rotate(np.flatnonzero(active & (actions == ROTATE)), 0)
+        self._rotate(np.flatnonzero(active & (actions == ROTATE_COUNTER)), 1)
+
+        # soft drop moves one extra row, hard drop moves until the piece lands
+        soft = np.flatnonzero(active & (actions == SOFT_DROP))
+        landed = self._move_down(soft)
+
+        falling = np.flatnonzero(active & (actions == HARD_DROP))
+        hard_landed = []
+        while len(falling):
+            blocked = self._move_down(falling)
+            hard_landed.append(blocked)
+            falling = np.setdiff1d(falling, blocked, assume_unique=True)
+
+        # gravity for everyone that hasn't landed yet
+        locking = np.zeros(self.num_boards, dtype=bool)
+        locking[landed] = True
+        for blocked in hard_landed:
+            locking[blocked] = True
+        gravity = np.flatnonzero(active & ~locking)
+        locking[self._move_down(gravity)] = True
+
+        self._lock(np.flatnonzero(locking))
+        return self.boards, self.score - score_before, self.done
@@ -0,0 +1,390 @@
+# Benchmarks for the game logic and rendering hot paths.
+# Runs under SDL's dummy video driver, writes the results as json and compares
+# them against a stored baseline so performance regressions show up before deploying.
+#
+# usage: python tetris_game/benchmark.py [--output results.json] [--baseline baseline.json] [--save-baseline]
+
+import json
+import os
+import platform
+import statistics
+import sys
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from constants import COLUMNS, ROWS
+from engine import Board, Engine, Tetromino, SHAPES
+from simulation import Simulation, CONTROLS
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers a benchmark. The decorated function does the setup and returns the function to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def measure(func, repeat = 7, min_time = 0.05):
+    """Per call time in microseconds: the loop count is calibrated so one run takes at least min_time"""
+    loops = 1
+    while True:
+        start = perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    times = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = perf_counter()
+        for _ in range(loops):
+            func()
+        times.append((perf_counter() - start) / loops)
+    times = [t * 1e6 for t in times]
+    return {"median_us": statistics.median(times), "best_us": min(times), "loops": loops}
+
+
+def dense_board(full_rows, random, columns = COLUMNS, rows = ROWS):
+    """A board filled to 3/4 with random cells and the given number of full rows"""
+    board = Board(columns, rows)
+    for y in range(board.height // 4, board.height):
+        full = y >= board.height - full_rows
+        for x in range(board.columns):
+            if full or random.random() < 0.7:
+                board.place(x, y, [(0, 0)], random.randrange(1, len(SHAPES) + 1))
+    return board
+
+
+# ---------- game logic ----------
+
+@benchmark("tetromino.move_down")
+def bench_move_down():
+    board = Board()
+    tetromino = Tetromino('T')
+    start_y = tetromino.y
+
+    def run():
+        tetromino.y = start_y
+        tetromino.move_down(board)
+    return run
+
+
+@benchmark("tetromino.move_horizontal")
+def bench_move_horizontal():
+    board = Board()
+    tetromino = Tetromino('T')
+
+    def run():
+        tetromino.move_horizontal(board, -1)
+        tetromino.move_horizontal(board, 1)
+    return run
+
+
+@benchmark("tetromino.rotate")
+def bench_rotate():
+    board = dense_board(0, Random(0))
+    tetromino = Tetromino('T')
+    tetromino.y = 3
+
+    def run():
+        tetromino.rotate(board)
+    return run
+
+
+@benchmark("tetromino.rotate_counter")
+def bench_rotate_counter():
+    board = dense_board(0, Random(0))
+    tetromino = Tetromino('I')
+    tetromino.y = 3
+
+    def run():
+        tetromino.rotate_counter(board)
+    return run
+
+
+@benchmark("board.copy")
+def bench_board_copy():
+    board = dense_board(4, Random(1))
+    return board.copy
+
+
+@benchmark("board.copy + check_finished_rows (dense, 4 full rows)")
+def bench_finished_rows():
+    template = dense_board(4, Random(1))
+
+    def run():
+        board = template.copy()
+        board.clear_rows()
+    return run
+
+
+@benchmark("board.copy + check_finished_rows (1000x1000, 4 full rows)")
+def bench_finished_rows_large():
+    template = dense_board(4, Random(1), 1000, 1000)
+
+    def run():
+        board = template.copy()
+        board.clear_rows()
+    return run
+
+
+@benchmark("board.copy + check_finished_rows (1000x1000, top row cleared)")
+def bench_finished_rows_flat():
+    # the cleared row is the top of every column, so no height can just be shifted down
+    template = dense_board(0, Random(1), 1000, 1000)
+    top = template.height // 4
+    for x in range(template.columns):
+        if not template.rows[top] >> x & 1:
+            template.place(x, top, [(0, 0)], 1)
+
+    def run():
+        board = template.copy()
+        board.clear_rows()
+    return run
+
+
+@benchmark("engine.snapshot + restore")
+def bench_snapshot():
+    engine = Engine(lambda: 'T')
+    engine.board = dense_board(0, Random(1))
+
+    def run():
+        engine.restore(engine.snapshot())
+    return run
+
+
+@benchmark("simulation.step (random input)")
+def bench_simulation_step():
+    random = Random(2)
+    simulation = Simulation(lambda: random.choice(SHAPES))
+
+    def run():
+        if simulation.engine.game_over:
+            simulation.__init__(lambda: random.choice(SHAPES))
+        if random.random() < 0.1:
+            simulation.set_held([random.choice(CONTROLS)])
+        simulation.step()
+    return run
+
+
+@benchmark("game: simulated random game until top out")
+def bench_simulated_game():
+    random = Random(3)
+
+    def run():
+        simulation = Simulation(lambda: random.choice(SHAPES))
+        while not simulation.engine.game_over:
+            if random.random() < 0.1:
+                simulation.set_held([random.choice(CONTROLS)])
+            simulation.step()
+    return run
+
+
+@benchmark("game: bot plays 50 pieces")
+def bench_bot_game():
+    from bot import Bot
+    random = Random(4)
+
+    def run():
+        engine = Engine(lambda: random.choice(SHAPES))
+        bot = Bot(lookahead = 0)
+        while not engine.game_over and engine.pieces < 50:
+            bot.play(engine)
+    return run
+
+
+@benchmark("finesse: keypresses for the chosen placement")
+def bench_finesse_keypresses():
+    from bot import Bot
+    from finesse import keypresses, load
+    paths = load()
+    engine = Engine(lambda: "T")
+    engine.board = dense_board(0, Random(1))
+    placement = Bot(lookahead = 0).choose(engine.board, engine.tetromino)
+    return lambda: keypresses(paths, engine.board, engine.tetromino, placement)
+
+
+@benchmark("batch: 1024 boards, one step")
+def bench_batch_step():
+    try:
+        import numpy as np
+        from batch import BatchEnv, NUM_ACTIONS
+    except ImportError:
+        return None
+    env = BatchEnv(1024, seed = 0)
+    actions = np.random.default_rng(0).integers(0, NUM_ACTIONS, (64, 1024))
+    counter = iter(range(1 << 62))
+
+    def run():
+        env.step(actions[next(counter) % len(actions)])
+        if env.done.any():
+            env.reset(env.done)
+    return run
+
+
+# ---------- rendering ----------
+
+def make_main(**kwargs):
+    from main import Main
+    main = Main(seed = 0, **kwargs)
+    random = Random(5)
+    engine = main.game.engine
+    # fill up the board a bit so there is something to draw
+    for _ in range(12):
+        for _ in range(random.randrange(5)):
+            engine.move_horizontal(random.choice((-1, 1)))
+        while engine.move_down():
+            pass
+    return main
+
+
+@benchmark("render: game.draw_blocks")
+def bench_draw_blocks():
+    main = make_main()
+    pieces = main.game.piece_tiles()
+    return lambda: main.game.draw_blocks(pieces)
+
+
+def crowded_field(renderer, columns = COLUMNS, rows = ROWS):
+    """Redraws the whole field of a board filled to 3/4"""
+    main = make_main(renderer = renderer, columns = columns, rows = rows)
+    game = main.game
+    game.engine.board = dense_board(0, Random(1), columns, rows)
+    game.engine.tetromino.y = 0
+    pieces = game.piece_tiles()
+    return lambda: game.draw_field(pieces)
+
+
+@benchmark("render: crowded field, tiles renderer")
+def bench_field_tiles():
+    return crowded_field("tiles")
+
+
+@benchmark("render: crowded field, array renderer")
+def bench_field_array():
+    return crowded_field("array")
+
+
+@benchmark("render: crowded 100x100 field, tiles renderer")
+def bench_big_field_tiles():
+    return crowded_field("tiles", 100, 100)
+
+
+@benchmark("render: crowded 100x100 field, array renderer")
+def bench_big_field_array():
+    return crowded_field("array", 100, 100)
+
+
+@benchmark("render: full frame (game + score + preview, full redraw)")
+def bench_full_frame():
+    import pygame
+    main = make_main()
+
+    def run():
+        main.display_surface.fill((128, 128, 128))
+        for panel in (main.game, main.score, main.preview):
+            panel.invalidate()
+        main.game.run()
+        main.score.run()
+        main.preview.run(main.next_shapes)
+        pygame.display.update()
+    return run
+
+
+@benchmark("render: dirty frame (piece moving)")
+def bench_dirty_frame():
+    import pygame
+    main = make_main()
+    engine = main.game.engine
+    direction = [1]
+
+    def run():
+        if not engine.move_horizontal(direction[0]):
+            direction[0] = -direction[0]
+        rects = main.game.run() + main.score.run() + main.preview.run(main.next_shapes)
+        pygame.display.update(rects)
+    return run
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints the change against the baseline, returns the names that got slower than the threshold.
+    Compares the best run, it is a lot less noisy than the median for sub-microsecond timings
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["best_us"]
+        change = result["best_us"] / before - 1 if before else 0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<60} {before:>12.2f} -> {result['best_us']:>12.2f} us  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the game logic and rendering hot paths")
+    parser.add_argument("--output", metavar="PATH", help="write the results as json")
+    parser.add_argument("--baseline", metavar="PATH", default="benchmark_baseline.json", help="stored results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.20, help="slowdown that counts as a regression (0.20 = 20%%)")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    # assets are loaded relative to the project root
+    args.baseline = os.path.abspath(args.baseline)
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        func = setup()
+        if func is None:
+            print(f"{name:<60} skipped")
+            continue
+        results[name] = measure(func)
+        print(f"{name:<60} {results[name]['median_us']:>12.2f} us")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        print(f"\ncompared to {args.baseline}:")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"\nsaved baseline to {args.baseline}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
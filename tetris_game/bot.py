@@ -0,0 +1,218 @@
+# Move generator and placement search bot.
+# enumerate_placements does a breadth first search over (x, y, rotation_state) using
+# the same moves and SRS kicks as the game, with a transposition table so every
+# state is only expanded once. Bot scores the final placements and can look ahead
+# through the preview queue.
+#
+# usage: python tetris_game/bot.py [pieces] [lookahead]
+
+import sys
+from collections import deque, namedtuple
+from time import perf_counter
+
+from engine import Engine, Tetromino
+from randomizer import Randomizer
+from srs import ROTATIONS, CLOCKWISE, COUNTER_CLOCKWISE
+from simulation import LEFT, RIGHT, ROTATE, ROTATE_COUNTER, DOWN
+from finesse import DAS_LEFT, DAS_RIGHT, keypresses, load as load_finesse
+
+# a final resting place of a piece and the moves that get it there from where it is now
+Placement = namedtuple('Placement', 'x y rotation_state blocks path')
+
+# Weights for the board evaluation (aggregate height, complete lines, holes, bumpiness)
+WEIGHTS = {
+    "height": -0.510066,
+    "lines": 0.760666,
+    "holes": -0.35663,
+    "bumpiness": -0.184483,
+}
+
+
+def enumerate_placements(board, tetromino):
+    """
+    Every reachable final placement of the tetromino on the board, found with a BFS
+    from its current state. Placements that cover the same cells are only returned once,
+    with the shortest path that reaches them.
+    """
+    shape = tetromino.shape
+    rotations = ROTATIONS[shape]
+    collides = board.collides
+
+    start = (tetromino.x, tetromino.y, tetromino.rotation_state, tetromino.blocks)
+    # transposition table: (x, y, rotation_state) -> (previous state key, move)
+    seen = {start[:3]: None}
+    queue = deque([start])
+    placements = {}
+
+    while queue:
+        state = queue.popleft()
+        x, y, rotation_state, blocks = state
+        key = state[:3]
+
+        successors = []
+        if not collides(x - 1, y, blocks):
+            successors.append((LEFT, (x - 1, y, rotation_state, blocks)))
+        if not collides(x + 1, y, blocks):
+            successors.append((RIGHT, (x + 1, y, rotation_state, blocks)))
+        if not collides(x, y + 1, blocks):
+            successors.append((DOWN, (x, y + 1, rotation_state, blocks)))
+        else:
+            # resting on something, this is a final placement
+            cells = frozenset((x + dx, y + dy) for dx, dy in blocks)
+            if cells not in placements:
+                placements[cells] = (key, blocks)
+
+        for move, direction in ((ROTATE, CLOCKWISE), (ROTATE_COUNTER, COUNTER_CLOCKWISE)):
+            new_rotation_state, new_blocks, kicks = rotations[rotation_state][direction]
+            for kick_x, kick_y in kicks:
+                if not collides(x + kick_x, y + kick_y, new_blocks):
+                    successors.append((move, (x + kick_x, y + kick_y, new_rotation_state, new_blocks)))
+                    break
+
+        for move, successor in successors:
+            successor_key = successor[:3]
+            if successor_key not in seen:
+                seen[successor_key] = (key, move)
+                queue.append(successor)
+
+    result = []
+    for key, blocks in placements.values():
+        path = []
+        step = seen[key]
+        while step:
+            key_before, move = step
+            path.append(move)
+            step = seen[key_before]
+        path.reverse()
+        result.append(Placement(*key[:3], blocks, path))
+    return result
+
+
+def evaluate(rows, columns, full_mask, lines):
+    """Scores a board given as row bitmasks, higher is better"""
+    height = len(rows)
+    heights = [0] * columns
+    holes = 0
+    seen = 0
+    for y, row in enumerate(rows):
+        # empty cells below a filled cell in the same column
+        holes += bin(seen & ~row & full_mask).count('1')
+        new = row & ~seen
+        while new:
+            bit = new & -new
+            heights[bit.bit_length() - 1] = height - y
+            new ^= bit
+        seen |= row
+
+    bumpiness = sum(abs(heights[i] - heights[i + 1]) for i in range(columns - 1))
+    return (WEIGHTS["height"] * sum(heights) + WEIGHTS["lines"] * lines
+            + WEIGHTS["holes"] * holes + WEIGHTS["bumpiness"] * bumpiness)
+
+
+class Bot:
+    def __init__(self, lookahead = 1, finesse = None):
+        """
+        picks the placement with the best evaluation, looking ahead through
+        up to lookahead pieces of the preview queue.
+        finesse is a finesse table (finesse.load()), with it the chosen placement is
+        reached with the fewest inputs whenever the stack doesn't get in the way
+        """
+        self.lookahead = lookahead
+        self.finesse = finesse
+
+        # stats
+        self.placements = 0
+        self.search_time = 0
+
+    @property
+    def placements_per_second(self):
+        return self.placements / self.search_time if self.search_time else 0
+
+    def place(self, board, placement, color_index):
+        """A copy of the board with the placement locked in and full rows cleared"""
+        board = board.copy()
+        board.place(placement.x, placement.y, placement.blocks, color_index)
+        lines = board.clear_rows()
+        return board, lines
+
+    def search(self, board, tetromino, next_shapes, depth):
+        """Best score and placement for the tetromino on this board"""
+        best_score, best = float('-inf'), None
+        placements = enumerate_placements(board, tetromino)
+        self.placements += len(placements)
+
+        for placement in placements:
+            if any(placement.y + dy < 0 for _, dy in placement.blocks):
+                continue  # would lock above the field
+            new_board, lines = self.place(board, placement, tetromino.color_index)
+
+            if depth > 0 and next_shapes:
+                following = Tetromino(next_shapes[0], board.columns)
+                if new_board.collides(following.x, following.y, following.blocks):
+                    continue
+                score, _ = self.search(new_board, following, next_shapes[1:], depth - 1)
+                score += WEIGHTS["lines"] * lines
+            else:
+                score = evaluate(new_board.rows, new_board.columns, new_board.full_mask, lines)
+
+            if score > best_score:
+                best_score, best = score, placement
+        return best_score, best
+
+    def choose(self, board, tetromino, next_shapes = ()):
+        """The placement to go for with the current piece, None if there is nothing reachable"""
+        start = perf_counter()
+        _, placement = self.search(board, tetromino, list(next_shapes), self.lookahead)
+        self.search_time += perf_counter() - start
+        return placement
+
+    def play(self, engine, next_shapes = ()):
+        """Chooses a placement for the engine's current piece, moves it there and locks it"""
+        placement = self.choose(engine.board, engine.tetromino, next_shapes)
+        if placement is None:
+            # nothing fits, just let it fall
+            while engine.move_down():
+                pass
+            return None
+
+        actions = {
+            LEFT: lambda: engine.move_horizontal(-1),
+            RIGHT: lambda: engine.move_horizontal(1),
+            DAS_LEFT: lambda: self.shift_to_wall(engine, -1),
+            DAS_RIGHT: lambda: self.shift_to_wall(engine, 1),
+            ROTATE: engine.rotate,
+            ROTATE_COUNTER: engine.rotate_counter,
+            DOWN: engine.move_down,
+        }
+        path = self.inputs(engine, placement)
+        for move in path:
+            actions[move]()
+        engine.hard_drop()  # locks it
+        return placement
+
+    def inputs(self, engine, placement):
+        """The moves that take the engine's current piece to placement, before it is dropped"""
+        if self.finesse:
+            path = keypresses(self.finesse, engine.board, engine.tetromino, placement)
+            if path is not None:
+                return path
+        return placement.path
+
+    @staticmethod
+    def shift_to_wall(engine, direction):
+        while engine.move_horizontal(direction):
+            pass
+
+
+if __name__ == "__main__":
+    pieces = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    lookahead = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    randomizer = Randomizer(0, "random")
+    engine = Engine(randomizer.next_shape)
+    bot = Bot(lookahead, load_finesse())
+    while not engine.game_over and engine.pieces < pieces:
+        bot.play(engine, randomizer.queue)
+
+    print(f"pieces {engine.pieces}, lines {engine.current_lines}, score {engine.current_score}, level {engine.current_level}")
+    print(f"{bot.placements} placements searched, {bot.placements_per_second:.0f} placements/s")
@@ -0,0 +1,90 @@
+# Packs the shape images into one sprite atlas, so startup maps a single file of raw
+# pixels instead of decoding a PNG per shape.
+#
+# File layout (little endian):
+#   header:  b'TATL', version (u8), width and height in pixels (u16 each), metadata length (u32)
+#   metadata: json {"sprites": {name: [x, y, width, height]}}
+#   pixels:  width * height * 4 bytes of RGBA, row by row
+#
+# usage: python tetris_game/bundle.py   (run again whenever an image in graphics/ changes)
+
+import json
+import mmap
+import os
+import struct
+from os.path import join
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+from constants import TETROMINOS
+
+MAGIC = b'TATL'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHI')
+GRAPHICS = 'graphics'
+ATLAS_PATH = join(GRAPHICS, 'sprites.atlas')
+
+
+def sprite_paths(names = TETROMINOS):
+    return {name: join(GRAPHICS, f"{name}.png") for name in names}
+
+
+def pack(images):
+    """Lays the images out left to right, returns the atlas surface and name -> rect"""
+    width = sum(image.get_width() for image in images.values())
+    height = max(image.get_height() for image in images.values())
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+    rects = {}
+    x = 0
+    for name, image in images.items():
+        rects[name] = [x, 0, image.get_width(), image.get_height()]
+        atlas.blit(image, (x, 0))
+        x += image.get_width()
+    return atlas, rects
+
+
+def build(path = ATLAS_PATH, names = TETROMINOS):
+    images = {name: pygame.image.load(image_path) for name, image_path in sprite_paths(names).items()}
+    atlas, rects = pack(images)
+    metadata = json.dumps({"sprites": rects}).encode()
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, atlas.get_width(), atlas.get_height(), len(metadata)))
+        file.write(metadata)
+        file.write(pygame.image.tobytes(atlas, 'RGBA'))
+    return rects
+
+
+def is_stale(path = ATLAS_PATH, names = TETROMINOS):
+    """True if the atlas is missing or older than one of the images it was built from"""
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    return any(os.path.getmtime(image_path) > built for image_path in sprite_paths(names).values())
+
+
+def load(path = ATLAS_PATH):
+    """
+    Maps the atlas and returns name -> sprite. The sprites are subsurfaces of one
+    display format surface, so this needs a display mode to be set
+    """
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, version, width, height, metadata_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} sprite atlas")
+        start = HEADER.size + metadata_length
+        metadata = json.loads(data[HEADER.size:start])
+        pixels = memoryview(data)[start:start + width * height * 4]
+        try:
+            # convert_alpha copies the pixels, so the mapping can be closed afterwards
+            atlas = pygame.image.frombuffer(pixels, (width, height), 'RGBA').convert_alpha()
+        finally:
+            pixels.release()
+    return {name: atlas.subsurface(rect) for name, rect in metadata["sprites"].items()}
+
+
+if __name__ == "__main__":
+    # images are found relative to the project root
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    rects = build()
+    print(f"packed {len(rects)} sprites into {ATLAS_PATH} ({os.path.getsize(ATLAS_PATH)} bytes)")
@@ -1,5 +1,3 @@
-import pygame
-
 # Screen dimensions
 
 # Grid dimensions
@@ -8,6 +6,9 @@ ROWS = 20
 CELL_SIZE = 35
 BORDER_WIDTH = COLUMNS * CELL_SIZE 
 BORDER_HEIGHT= ROWS * CELL_SIZE 
+# bigger boards are drawn with smaller cells, down to MIN_CELL_SIZE, past that the view scrolls
+MIN_CELL_SIZE = 6
+GRID_MIN_CELL_SIZE = 10  # no grid lines below this, they would cover the cells
 
 #Side bar for pieces and score
 SIDE_BAR_WIDTH = 200
@@ -21,12 +22,15 @@ WINDOW_HEIGHT = BORDER_HEIGHT + PADDING * 2
 
 
 #Blocks
-OFFSET = pygame.Vector2(COLUMNS // 2 , -1)
+SPAWN_ROW = -1  # pieces spawn with their pivot on this row (plus its offset in the shape), centered horizontally
 
 #Timer 
 UPDATE_START_SPEED = 300  # milliseconds
-MOVE_WAIT_TIME = 75
-ROTATE_WAIT_TIME = 150
+DAS = 133  # delayed auto shift: ms a direction is held before it repeats
+ARR = 33  # auto repeat rate: ms between repeated moves, 0 moves straight to the wall
+SIMULATION_STEP = 5  # milliseconds of game time per fixed simulation step
+MAX_FPS = 100  # frame rate cap while something is changing on screen
+REWIND_PIECES = 100  # how many pieces practice mode can undo
 
 #colors 
 RED = (224, 11, 85)
@@ -52,3 +56,7 @@ TETROMINOS = {
 }
 
 SCORE_DATA = {1: 40, 2: 100, 3: 300, 4: 1200}
+
+#Versus: garbage lines sent to the opponent per number of cleared lines
+GARBAGE_LINES = {2: 1, 3: 2, 4: 4}
+GARBAGE_COLOR = GRAY
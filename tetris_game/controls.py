@@ -0,0 +1,86 @@
+# Event driven keyboard input: key presses and releases are queued with a time and handed
+# to the simulation at that time, between fixed steps, instead of polling the keyboard
+# once per frame. Also measures how long it takes for an input to show up on screen.
+#
+# SDL knows when a key event happened but pygame (2.6) doesn't pass it on, so events are
+# stamped when the game sees them: right away when one wakes up an idle loop (see
+# Main.wait_for_work), at the start of the frame otherwise. While frames are busy, inputs
+# are only as precise as the frame rate, but none get lost or merged.
+
+from collections import deque
+
+import pygame
+import simulation
+
+KEY_CONTROLS = {
+    pygame.K_LEFT: simulation.LEFT,
+    pygame.K_RIGHT: simulation.RIGHT,
+    pygame.K_UP: simulation.ROTATE,
+    pygame.K_z: simulation.ROTATE_COUNTER,
+    pygame.K_DOWN: simulation.DOWN,
+    pygame.K_SPACE: simulation.HARD_DROP,
+}
+
+
+class KeyboardInput:
+    def __init__(self, start_time, key_controls = KEY_CONTROLS, latency_samples = 256):
+        """
+        start_time is the pygame tick the simulation clock started at,
+        it maps event times to simulation times
+        """
+        self.start_time = start_time
+        self.key_controls = key_controls
+        self.queue = deque()  # (simulation time, control, pressed, event time)
+        self.held = set()
+
+        # input to display latency, ring buffer of milliseconds
+        self.unpresented = []
+        self.latencies = [0] * latency_samples
+        self.latency_index = 0
+        self.latency_count = 0
+
+    def handle_event(self, event):
+        """Queues key presses and releases, returns True if the event was used"""
+        if event.type == pygame.WINDOWFOCUSLOST:
+            # key releases are not delivered while the window is in the background
+            now = pygame.time.get_ticks()
+            for control in list(self.held):
+                self.queue.append((now - self.start_time, control, False, now))
+            return False
+
+        if event.type not in (pygame.KEYDOWN, pygame.KEYUP) or event.key not in self.key_controls:
+            return False
+        # the time the event was stamped with if it has one, otherwise now
+        time = getattr(event, 'timestamp', None) or pygame.time.get_ticks()
+        self.queue.append((time - self.start_time, self.key_controls[event.key], event.type == pygame.KEYDOWN, time))
+        return True
+
+    def apply_due(self, game_simulation):
+        """
+        Hands every queued input that happened at or before the simulation's current time to it,
+        one at a time, so a press and its release in the same step still act
+        """
+        queue = self.queue
+        while queue and queue[0][0] <= game_simulation.time:
+            _, control, pressed, time = queue.popleft()
+            if pressed:
+                self.held.add(control)
+            else:
+                self.held.discard(control)
+            game_simulation.set_held(self.held)
+            self.unpresented.append(time)
+
+    def presented(self, now):
+        """Called right after the display was updated, everything applied so far is on screen now"""
+        for time in self.unpresented:
+            self.latencies[self.latency_index] = now - time
+            self.latency_index = (self.latency_index + 1) % len(self.latencies)
+            self.latency_count = min(self.latency_count + 1, len(self.latencies))
+        self.unpresented.clear()
+
+    def latency_percentiles(self, percentiles = (50, 99)):
+        """Input to display latency percentiles in milliseconds"""
+        if not self.latency_count:
+            return [0 for _ in percentiles]
+        values = sorted(self.latencies[:self.latency_count])
+        return [values[min(self.latency_count - 1, self.latency_count * p // 100)] for p in percentiles]
@@ -0,0 +1,391 @@
+# Headless game engine: the rules of the game without any pygame dependency.
+# The board is stored as one integer bitmask per row (bit x set = cell occupied)
+# so collision checks and full row detection are plain bitwise operations.
+
+from bisect import bisect_left
+from collections import deque, namedtuple
+
+from constants import COLUMNS, ROWS, TETROMINOS, SCORE_DATA, GARBAGE_LINES, GARBAGE_COLOR, SPAWN_ROW
+from srs import ORIENTATIONS, ROTATIONS, BOTTOMS, CLOCKWISE, COUNTER_CLOCKWISE
+
+# Shapes in a fixed order, cell values on the board are index + 1 (0 = empty)
+SHAPES = tuple(TETROMINOS.keys())
+COLOR_INDEX = {shape: i + 1 for i, shape in enumerate(SHAPES)}
+GARBAGE_INDEX = len(SHAPES) + 1
+PALETTE = [None] + [TETROMINOS[shape]['color'] for shape in SHAPES] + [GARBAGE_COLOR]
+COLOR_BYTES = [bytes((i,)) for i in range(len(PALETTE))]
+
+# the complete state of an engine, see Engine.snapshot
+EngineState = namedtuple("EngineState", "board tetromino level score lines pieces game_over pending_garbage")
+
+
+class Board:
+    def __init__(self, columns = COLUMNS, rows = ROWS):
+        """
+        the playing field, one bitmask per row for collisions
+        and one bytes object per row with the color index of every cell.
+        Rows are never changed in place, a changed row is a new object,
+        so copies (and snapshots) share every row that did not change
+        """
+        self.columns = columns
+        self.height = rows
+        self.full_mask = (1 << columns) - 1
+
+        self.rows = [0] * rows
+        self.cells = [bytes(columns)] * rows
+
+        # index kept up to date on every place and clear:
+        # height of the highest filled cell of every column (0 = empty column)
+        # and the number of filled cells in every row
+        self.heights = [0] * columns
+        self.row_counts = [0] * rows
+
+        # bumped on every change so renderers know when to redraw
+        self.version = 0
+
+    def copy(self):
+        board = Board.__new__(Board)
+        board.columns = self.columns
+        board.height = self.height
+        board.full_mask = self.full_mask
+        board.rows = list(self.rows)
+        board.cells = list(self.cells)
+        board.heights = list(self.heights)
+        board.row_counts = list(self.row_counts)
+        board.version = self.version
+        return board
+
+    def collides(self, x, y, blocks):
+        """Check if the blocks (relative to x, y) hit a wall, the floor or a locked cell"""
+        rows = self.rows
+        for dx, dy in blocks:
+            cx = x + dx
+            cy = y + dy
+            if cx < 0 or cx >= self.columns or cy >= self.height:
+                return True
+            # cells above the field are free
+            if cy >= 0 and rows[cy] >> cx & 1:
+                return True
+        return False
+
+    def place(self, x, y, blocks, color_index):
+        heights = self.heights
+        cells = self.cells
+        color = COLOR_BYTES[color_index]
+        for dx, dy in blocks:
+            cx = x + dx
+            cy = y + dy
+            self.rows[cy] |= 1 << cx
+            row = cells[cy]
+            cells[cy] = row[:cx] + color + row[cx + 1:]
+            self.row_counts[cy] += 1
+            if self.height - cy > heights[cx]:
+                heights[cx] = self.height - cy
+        self.version += 1
+
+    def finished_rows(self):
+        columns = self.columns
+        return [i for i, count in enumerate(self.row_counts) if count == columns]
+
+    def clear_rows(self):
+        """Removes all full rows and drops everything above them, returns the number of cleared rows"""
+        columns = self.columns
+        keep = [i for i, count in enumerate(self.row_counts) if count != columns]
+        cleared = self.height - len(keep)
+        if cleared:
+            cleared_rows = set(range(self.height)).difference(keep)
+            self.rows = [0] * cleared + [self.rows[i] for i in keep]
+            self.cells = [bytes(self.columns)] * cleared + [self.cells[i] for i in keep]
+            self.row_counts = [0] * cleared + [self.row_counts[i] for i in keep]
+
+            # every column reaches into every full row, so all columns drop by the number of
+            # cleared rows, unless its top cell was cleared and there are holes below it.
+            # Then the column is scanned from where the empty cells above its old top end,
+            # so that costs at most its height
+            sorted_rows = None
+            for x, height in enumerate(self.heights):
+                if not height:
+                    continue
+                top = self.height - height
+                if top not in cleared_rows:
+                    self.heights[x] = height - cleared
+                else:
+                    if sorted_rows is None:
+                        sorted_rows = sorted(cleared_rows)
+                    above = bisect_left(sorted_rows, top)
+                    self.heights[x] = self.column_height(x, top + cleared - above)
+            self.version += 1
+        return cleared
+
+    def add_garbage(self, lines, hole):
+        """
+        Pushes everything up and fills the bottom lines with garbage, except for the hole column.
+        Returns True if filled cells were pushed off the top
+        """
+        columns = self.columns
+        overflow = any(self.rows[:lines])
+        garbage = COLOR_BYTES[GARBAGE_INDEX] * hole + bytes(1) + COLOR_BYTES[GARBAGE_INDEX] * (columns - hole - 1)
+        self.rows = self.rows[lines:] + [self.full_mask & ~(1 << hole)] * lines
+        self.cells = self.cells[lines:] + [garbage] * lines
+        self.row_counts = self.row_counts[lines:] + [columns - 1] * lines
+
+        heights = self.heights
+        for x in range(columns):
+            if overflow:
+                heights[x] = self.column_height(x)
+            elif heights[x] or x != hole:
+                heights[x] += lines
+        self.version += 1
+        return overflow
+
+    def column_height(self, x, start = 0):
+        """
+        Height of a column found by scanning it from row start down, only needed
+        when the index can't be updated directly
+        """
+        rows = self.rows
+        for y in range(start, self.height):
+            if rows[y] >> x & 1:
+                return self.height - y
+        return 0
+
+    def drop_distance(self, x, y, bottoms):
+        """
+        How far a piece can fall, from the column heights: constant time per column.
+        bottoms is the lowest block offset of the piece per column (srs.BOTTOMS).
+        Returns None if the piece is below the top of a column (tucked under an overhang),
+        the heights can't tell where it lands then
+        """
+        distance = self.height
+        heights = self.heights
+        for dx, dy in bottoms:
+            free = self.height - heights[x + dx] - (y + dy) - 1
+            if free < 0:
+                return None
+            if free < distance:
+                distance = free
+        return distance
+
+
+class Tetromino:
+    def __init__(self, shape, columns = COLUMNS):
+        """
+        a falling piece, stored as the position of its pivot (the first block)
+        plus the offsets of every block relative to that pivot
+        """
+        self.shape = shape
+        self.color_index = COLOR_INDEX[shape]
+
+        pivot_x, pivot_y = TETROMINOS[shape]['shape'][0]
+        self.x = columns // 2 + pivot_x
+        self.y = SPAWN_ROW + pivot_y
+
+        # SRS rotation state (0, 1, 2, 3 representing 0°, 90°, 180°, 270°)
+        self.rotation_state = 0
+        self.blocks = ORIENTATIONS[shape][0]
+
+    def copy(self):
+        tetromino = Tetromino.__new__(Tetromino)
+        tetromino.shape = self.shape
+        tetromino.color_index = self.color_index
+        tetromino.x = self.x
+        tetromino.y = self.y
+        tetromino.rotation_state = self.rotation_state
+        tetromino.blocks = self.blocks
+        return tetromino
+
+    def positions(self):
+        return [(self.x + dx, self.y + dy) for dx, dy in self.blocks]
+
+    def move_down(self, board):
+        """Moves the piece down by one, returns False if it is resting on something"""
+        if board.collides(self.x, self.y + 1, self.blocks):
+            return False
+        self.y += 1
+        return True
+
+    def move_horizontal(self, board, amount):
+        if board.collides(self.x + amount, self.y, self.blocks):
+            return False
+        self.x += amount
+        return True
+
+    def drop_distance(self, board):
+        """How many rows the piece can fall before it lands"""
+        distance = board.drop_distance(self.x, self.y, BOTTOMS[self.shape][self.rotation_state])
+        if distance is None:
+            distance = 0
+            while not board.collides(self.x, self.y + distance + 1, self.blocks):
+                distance += 1
+        return distance
+
+    def rotate(self, board):
+        """Super Rotation System (SRS) clockwise rotation with wall kicks"""
+        return self._rotate(board, CLOCKWISE)
+
+    def rotate_counter(self, board):
+        """Super Rotation System (SRS) counterclockwise rotation with wall kicks"""
+        return self._rotate(board, COUNTER_CLOCKWISE)
+
+    def _rotate(self, board, direction):
+        new_rotation_state, new_blocks, kicks = ROTATIONS[self.shape][self.rotation_state][direction]
+
+        # Try each wall kick offset, the first valid one is applied
+        for kick_x, kick_y in kicks:
+            if not board.collides(self.x + kick_x, self.y + kick_y, new_blocks):
+                self.x += kick_x
+                self.y += kick_y
+                self.blocks = new_blocks
+                self.rotation_state = new_rotation_state
+                return True
+
+        # If no wall kick worked (or the piece is an O), rotation fails (do nothing)
+        return False
+
+
+class Engine:
+    def __init__(self, get_next_shape, update_score = None, columns = COLUMNS, rows = ROWS, send_garbage = None, piece_locked = None):
+        """
+        runs the rules of the game: moving, rotating, locking pieces,
+        clearing lines and keeping score. Has no knowledge of pygame.
+        send_garbage(lines) is called when cleared lines attack the opponent in versus mode,
+        piece_locked(tetromino, lines) after every piece that locked, before the next one spawns
+        """
+        self.board = Board(columns, rows)
+        self.get_next_shape = get_next_shape  # Function to get the next shape
+        self.update_score = update_score
+        self.send_garbage = send_garbage
+        self.piece_locked = piece_locked
+        self.pending_garbage = deque()  # [lines, hole] received but not added to the board yet
+
+        self.current_level = 1
+        self.current_score = 0
+        self.current_lines = 0
+        self.pieces = 0
+        self.game_over = False
+
+        self.create_tetromino()
+
+    def snapshot(self):
+        """
+        The complete state, cheap enough to take thousands of times a second:
+        the board rows are shared with the live board instead of copied
+        """
+        return EngineState(
+            self.board.copy(), self.tetromino.copy(),
+            self.current_level, self.current_score, self.current_lines,
+            self.pieces, self.game_over,
+            tuple((lines, hole) for lines, hole in self.pending_garbage))
+
+    def restore(self, state):
+        """Goes back to a snapshot, the snapshot itself stays untouched so it can be restored again"""
+        version = self.board.version
+        self.board = state.board.copy()
+        # renderers compare versions, the restored board must not look like one they already drew
+        self.board.version = max(version, state.board.version) + 1
+        self.tetromino = state.tetromino.copy()
+        self.current_level = state.level
+        self.current_score = state.score
+        self.current_lines = state.lines
+        self.pieces = state.pieces
+        self.game_over = state.game_over
+        self.pending_garbage = deque([lines, hole] for lines, hole in state.pending_garbage)
+        if self.update_score:
+            self.update_score(self.current_lines, self.current_score, self.current_level)
+
+    def create_tetromino(self):
+        self.tetromino = Tetromino(self.get_next_shape(), self.board.columns)
+        if self.board.collides(self.tetromino.x, self.tetromino.y, self.tetromino.blocks):
+            self.game_over = True
+
+    def calculate_score(self, num_lines):
+        self.current_lines += num_lines
+        self.current_score += SCORE_DATA[num_lines] * self.current_level
+
+        if self.current_lines / 10 > self.current_level:
+            self.current_level += 1
+        if self.update_score:
+            self.update_score(self.current_lines, self.current_score, self.current_level)
+
+    def check_finished_rows(self):
+        num_lines = self.board.clear_rows()
+        if num_lines:
+            self.calculate_score(num_lines)
+            self.attack(GARBAGE_LINES.get(num_lines, 0))
+        return num_lines
+
+    def attack(self, lines):
+        """Cleared lines cancel garbage that is still pending first, the rest goes to the opponent"""
+        pending = self.pending_garbage
+        while lines and pending:
+            cancelled = min(lines, pending[0][0])
+            pending[0][0] -= cancelled
+            lines -= cancelled
+            if not pending[0][0]:
+                pending.popleft()
+        if lines and self.send_garbage:
+            self.send_garbage(lines)
+
+    def receive_garbage(self, lines, hole):
+        """Garbage from the opponent, it rises when the next piece locks without clearing a line"""
+        self.pending_garbage.append([lines, hole])
+
+    def add_pending_garbage(self):
+        while self.pending_garbage:
+            lines, hole = self.pending_garbage.popleft()
+            if self.board.add_garbage(lines, hole):
+                self.game_over = True
+
+    def lock(self):
+        """Locks the current piece into the board, clears lines and spawns the next piece"""
+        tetromino = self.tetromino
+        self.pieces += 1
+        lines = 0
+        if any(y < 0 for _, y in tetromino.positions()):
+            # piece locked above the visible field
+            self.game_over = True
+        else:
+            self.board.place(tetromino.x, tetromino.y, tetromino.blocks, tetromino.color_index)
+            lines = self.check_finished_rows()
+            if not lines:
+                self.add_pending_garbage()
+        if self.piece_locked:
+            self.piece_locked(tetromino, lines)
+        if not self.game_over:
+            self.create_tetromino()
+
+    def move_down(self):
+        """Gravity / soft drop step, locks the piece if it can't move any further"""
+        if self.game_over:
+            return False
+        if not self.tetromino.move_down(self.board):
+            self.lock()
+            return False
+        return True
+
+    def hard_drop(self):
+        """Drops the piece straight to where it lands and locks it"""
+        if self.game_over:
+            return
+        self.tetromino.y += self.tetromino.drop_distance(self.board)
+        self.lock()
+
+    def ghost_positions(self):
+        """Where the current piece would land"""
+        distance = self.tetromino.drop_distance(self.board)
+        return [(x, y + distance) for x, y in self.tetromino.positions()]
+
+    def move_horizontal(self, amount):
+        if self.game_over:
+            return False
+        return self.tetromino.move_horizontal(self.board, amount)
+
+    def rotate(self):
+        if self.game_over:
+            return False
+        return self.tetromino.rotate(self.board)
+
+    def rotate_counter(self):
+        if self.game_over:
+            return False
+        return self.tetromino.rotate_counter(self.board)
@@ -0,0 +1,191 @@
+# Finesse: the fewest inputs that take a piece from its spawn to a placement when it is
+# dropped on an open field. Inputs are taps, holding a direction until the piece hits the
+# wall (auto shift) and rotations, with the game's own SRS rules. The paths for every
+# shape, rotation state and column are generated offline and saved to a small file, so
+# at play time a path is a dict lookup: for the live finesse check (FinesseCheck) and
+# for bots turning a placement into keypresses (keypresses).
+#
+# File layout (little endian):
+#   header:  b'TFIN', version (u8), columns (u16), number of entries (u32)
+#   entry:   shape index (u8), rotation state (u8), pivot x (i16), number of moves (u8),
+#            then one byte per move, an index into MOVES
+#
+# usage: python tetris_game/finesse.py   (run again when the rotation rules or COLUMNS change)
+
+import os
+import struct
+from collections import deque
+from os.path import abspath, dirname, join
+
+from constants import COLUMNS, ROWS
+from engine import Board, Tetromino, SHAPES
+from simulation import LEFT, RIGHT, ROTATE, ROTATE_COUNTER, DOWN
+
+# holding a direction until the piece stops at the wall counts as one input
+DAS_LEFT = 'das left'
+DAS_RIGHT = 'das right'
+MOVES = (LEFT, RIGHT, DAS_LEFT, DAS_RIGHT, ROTATE, ROTATE_COUNTER)
+
+MAGIC = b'TFIN'
+VERSION = 1
+HEADER = struct.Struct('<4sBHI')
+ENTRY = struct.Struct('<BBhB')
+TABLE_PATH = join(dirname(abspath(__file__)), 'finesse.table')
+
+
+def apply_move(board, tetromino, move):
+    """Does one input to the tetromino, returns False if it didn't move"""
+    if move == LEFT:
+        return tetromino.move_horizontal(board, -1)
+    if move == RIGHT:
+        return tetromino.move_horizontal(board, 1)
+    if move == ROTATE:
+        return tetromino.rotate(board)
+    if move == ROTATE_COUNTER:
+        return tetromino.rotate_counter(board)
+    direction = -1 if move == DAS_LEFT else 1
+    moved = False
+    while tetromino.move_horizontal(board, direction):
+        moved = True
+    return moved
+
+
+def landed_cells(board, tetromino):
+    """The cells the tetromino covers once it is dropped"""
+    distance = tetromino.drop_distance(board)
+    return frozenset((x, y + distance) for x, y in tetromino.positions())
+
+
+def build(columns = COLUMNS):
+    """
+    (shape, rotation state, x) -> the shortest path from spawn, with a BFS on an empty board.
+    Placements that cover the same cells (I, S and Z have two rotation states for each)
+    all get the shortest path to any of them
+    """
+    board = Board(columns, ROWS)
+    paths = {}
+    for shape in SHAPES:
+        start = Tetromino(shape, columns)
+        seen = {(start.x, start.y, start.rotation_state): ()}
+        queue = deque([start])
+        placements = {}  # (rotation state, x) -> landed cells
+        shortest = {}  # landed cells -> shortest path
+        while queue:
+            tetromino = queue.popleft()
+            path = seen[tetromino.x, tetromino.y, tetromino.rotation_state]
+            cells = landed_cells(board, tetromino)
+            placements.setdefault((tetromino.rotation_state, tetromino.x), cells)
+            shortest.setdefault(cells, path)
+            for move in MOVES:
+                moved = tetromino.copy()
+                if move in (DAS_LEFT, DAS_RIGHT):
+                    # only the walls stop it, no need to shift it over one column at a time
+                    offsets = [dx for dx, _ in moved.blocks]
+                    moved.x = -min(offsets) if move == DAS_LEFT else columns - 1 - max(offsets)
+                    if moved.x == tetromino.x:
+                        continue
+                elif not apply_move(board, moved, move):
+                    continue
+                key = (moved.x, moved.y, moved.rotation_state)
+                if key not in seen:
+                    seen[key] = path + (move,)
+                    queue.append(moved)
+        for (rotation_state, x), cells in placements.items():
+            paths[shape, rotation_state, x] = shortest[cells]
+    return paths
+
+
+def to_bytes(paths, columns = COLUMNS):
+    out = bytearray(HEADER.pack(MAGIC, VERSION, columns, len(paths)))
+    for (shape, rotation_state, x), path in sorted(paths.items()):
+        out += ENTRY.pack(SHAPES.index(shape), rotation_state, x, len(path))
+        out += bytes(MOVES.index(move) for move in path)
+    return bytes(out)
+
+
+def from_bytes(data):
+    """Returns (columns, paths)"""
+    magic, version, columns, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} finesse table")
+    paths = {}
+    pos = HEADER.size
+    for _ in range(count):
+        shape, rotation_state, x, length = ENTRY.unpack_from(data, pos)
+        pos += ENTRY.size
+        paths[SHAPES[shape], rotation_state, x] = tuple(MOVES[i] for i in data[pos:pos + length])
+        pos += length
+    return columns, paths
+
+
+def save(paths, path = TABLE_PATH, columns = COLUMNS):
+    with open(path, 'wb') as file:
+        file.write(to_bytes(paths, columns))
+
+
+def load(path = TABLE_PATH, columns = COLUMNS):
+    """The saved table, generated on the spot if it is missing or was made for another board width"""
+    try:
+        with open(path, 'rb') as file:
+            saved_columns, paths = from_bytes(file.read())
+        if saved_columns == columns:
+            return paths
+    except (OSError, ValueError, struct.error):
+        pass
+    return build(columns)
+
+
+def keypresses(paths, board, tetromino, placement):
+    """
+    The finesse path that takes the tetromino to placement (x, y, rotation_state and blocks,
+    like bot.Placement) on this board, ending with the piece above where it lands.
+    None if that path doesn't get there, e.g. when the stack is in the way or
+    the placement needs a soft drop
+    """
+    path = paths.get((tetromino.shape, placement.rotation_state, placement.x))
+    if path is None:
+        return None
+    moved = tetromino.copy()
+    for move in path:
+        apply_move(board, moved, move)
+    cells = frozenset((placement.x + dx, placement.y + dy) for dx, dy in placement.blocks)
+    return path if landed_cells(board, moved) == cells else None
+
+
+class FinesseCheck:
+    def __init__(self, paths):
+        """
+        counts the inputs of the falling piece, when it locks they are compared with the fewest
+        that would have put it there. Pieces that were soft dropped (tucks and spins) are not judged
+        """
+        self.paths = paths
+        self.inputs = 0
+        self.soft_dropped = False
+        self.faults = 0  # inputs over the fewest possible, for the whole game
+        self.last = None  # the same for the last piece, None if it wasn't judged
+
+    def pressed(self, controls):
+        for control in controls:
+            if control == DOWN:
+                self.soft_dropped = True
+            elif control in (LEFT, RIGHT, ROTATE, ROTATE_COUNTER):
+                self.inputs += 1
+
+    def piece_locked(self, tetromino):
+        """Judges the piece that locked, returns its extra inputs (None if it wasn't judged)"""
+        path = self.paths.get((tetromino.shape, tetromino.rotation_state, tetromino.x))
+        if path is None or self.soft_dropped:
+            self.last = None
+        else:
+            self.last = max(0, self.inputs - len(path))
+            self.faults += self.last
+        self.inputs = 0
+        self.soft_dropped = False
+        return self.last
+
+
+if __name__ == "__main__":
+    paths = build()
+    save(paths)
+    print(f"{len(paths)} placements, at most {max(map(len, paths.values()))} inputs, "
+          f"saved to {TABLE_PATH} ({os.path.getsize(TABLE_PATH)} bytes)")
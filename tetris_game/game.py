@@ -1,368 +1,205 @@
-# Updated game.py with Super Rotation System (SRS)
+# The playfield panel: keyboard input, running the simulation in real time and drawing the field.
+# The rules live in engine.py and simulation.py (SRS rotation in srs.py), this is only the pygame side
 
+import pygame
 from constants import *
-from random import choice
-from timer import Timer
+from scheduler import FixedTimestep
+from simulation import Simulation
+from controls import KeyboardInput
+import assets
+
 
 class Game:
-    def __init__(self, get_next_shape, update_score):
+    def __init__(self, get_next_shape, update_score, recorder = None, das = DAS, arr = ARR, columns = COLUMNS, rows = ROWS, renderer = "tiles", telemetry = None, finesse = None):
         """
-        this is the overlay for the game that is put on top of the window
+        this is the overlay for the game that is put on top of the window.
+        Boards bigger than the default are drawn with smaller cells, and if even
+        MIN_CELL_SIZE cells don't fit the view scrolls along with the falling piece.
+        renderer is how the whole field is redrawn: "tiles" blits a tile per filled cell,
+        "array" paints every cell in one numpy pass (see raster.py)
         """
-        self.surface = pygame.Surface((BORDER_WIDTH, BORDER_HEIGHT))
-        self.display_surface = pygame.display.get_surface()
-        self.rect = self.surface.get_rect(topleft=(PADDING, PADDING))
-        self.sprites = pygame.sprite.Group()
-
-        self.get_next_shape = get_next_shape  # Function to get the next shape
-        self.update_score = update_score
-
-        self.line_surface = self.surface.copy()
-        self.line_surface.fill((0, 255,0))
-        self.line_surface.set_colorkey((0, 255, 0))
-        self.line_surface.set_alpha(120)  # Set transparency for grid lines
-
-        self.field_data = [[0 for x in range(COLUMNS)] for y in range (ROWS)]  # Initialize the field data
-        self.tetromino = Tetromino(
-            get_next_shape(),
-            self.sprites, 
-            self.create_tetromino,
-            self.field_data)  # Example tetromino, can be changed to any shape
-
-        self.down_speed = UPDATE_START_SPEED
-        self.down_speed_increment = self.down_speed * 0.3
-        self.down_pressed = False
-
-        self.timers = {
-            "vertical move": Timer(UPDATE_START_SPEED, True, self.move_down),
-            "horizontal move": Timer(MOVE_WAIT_TIME),
-            "rotate": Timer(ROTATE_WAIT_TIME)
-        }
-        self.timers["vertical move"].activate()
+        self.cell_size = max(MIN_CELL_SIZE, min(CELL_SIZE, BORDER_WIDTH // columns, BORDER_HEIGHT // rows))
+        self.view_columns = min(columns, BORDER_WIDTH // self.cell_size)
+        self.view_rows = min(rows, BORDER_HEIGHT // self.cell_size)
+        self.view_x = 0
+        self.view_y = 0
 
-        self.current_level = 1
-        self.current_score = 0
-        self.current_lines = 0
-
-    def calculate_score(self, num_lines):
-        self.current_lines += num_lines
-        self.current_score += SCORE_DATA[num_lines] * self.current_level
-
-        if self.current_lines / 10 > self.current_level:
-            self.current_level += 1
-        self.update_score(self.current_lines, self.current_score, self.current_level)
+        self.surface = pygame.Surface((self.view_columns * self.cell_size, self.view_rows * self.cell_size))
+        self.display_surface = pygame.display.get_surface()
+        self.rect = self.surface.get_rect(center=(PADDING + BORDER_WIDTH // 2, PADDING + BORDER_HEIGHT // 2))
+
+        # shared pre-rendered tiles and the grid lines baked once
+        self.tiles = assets.tiles(self.cell_size)
+        self.ghost_tiles = assets.ghost_tiles(self.cell_size)
+        self.grid_surface = None
+        if self.cell_size >= GRID_MIN_CELL_SIZE:
+            self.grid_surface = assets.grid_overlay(self.view_columns, self.view_rows, self.cell_size)
+        self.raster = None
+        if renderer == "array":
+            from raster import FieldRaster
+            self.raster = FieldRaster(self.surface, self.tiles + self.ghost_tiles, self.cell_size,
+                                      grid = self.grid_surface is not None)
+
+        # all the game rules and timers, run in fixed steps of real time
+        self.simulation = Simulation(get_next_shape, update_score, recorder = recorder, das = das, arr = arr,
+                                     columns = columns, rows = rows, telemetry = telemetry,
+                                     finesse = finesse)
+        self.engine = self.simulation.engine
+        self.timers = self.simulation.timers
+        self.timestep = FixedTimestep(SIMULATION_STEP, pygame.time.get_ticks)
+        self.keyboard = KeyboardInput(self.timestep.last_time)
+
+        # what is currently on screen, used to only redraw the cells that changed
+        self.full_redraw = True
+        self.drawn_board_version = None
+        self.drawn_pieces = {}
+
+    def handle_event(self, event):
+        return self.keyboard.handle_event(event)
 
     def timer_update(self):
-        for timer in self.timers.values():
-            timer.update()
-
-    def create_tetromino(self):
-        self.check_finished_rows()
-        self.tetromino = Tetromino(
-            self.get_next_shape(),  # Get the next shape from the provided function
-            self.sprites, 
-            self.create_tetromino,
-            self.field_data)
-
-    def move_down(self):
-        self.tetromino.move_down()
-
-    def draw_grid(self):
         """
-        Draws the grid lines on the game surface. HOWEVER IT STILL HAS A BACKGROUND COLOR
+        Catches the simulation up with real time, inputs are handed over
+        between the steps at the time they happened
         """
-        for col in range(1, COLUMNS):
-            x = col * CELL_SIZE
-            pygame.draw.line(self.surface, LINE_COLOR, (x, 0), (x, self.surface.get_height()), 1)    
-            
-        for row in range(1, ROWS):
-            y = row * CELL_SIZE
-            pygame.draw.line(self.surface, LINE_COLOR, (0, y), (self.surface.get_width(), y), 1)
+        for _ in range(self.timestep.steps()):
+            self.keyboard.apply_due(self.simulation)
+            self.simulation.step()
+        self.keyboard.apply_due(self.simulation)
 
-        self.surface.blit(self.line_surface, (0, 0))
-
-    def input(self):
-        keys  = pygame.key.get_pressed()
-
-        if not self.timers["horizontal move"].active:
-            if keys[pygame.K_LEFT]:
-                self.tetromino.move_horizontal(-1)
-                self.timers["horizontal move"].activate()
-            if keys[pygame.K_RIGHT]:
-                self.tetromino.move_horizontal(1)
-                self.timers['horizontal move'].activate()
-
-        if not self.timers["rotate"].active:
-            if keys[pygame.K_UP]:
-                self.tetromino.rotate()
-                self.timers["rotate"].activate()
-
-        if not self.timers["rotate"].active:#COCK
-            if keys[pygame.K_z]:
-                self.tetromino.rotate_counter()
-                self.timers["rotate"].activate()        
-
-        if not self.down_pressed and keys[pygame.K_DOWN]:
-            self.down_pressed = True
-            self.timers["vertical move"].duration = self.down_speed_increment
-            
-        if self.down_pressed and not keys[pygame.K_DOWN]:
-            self.down_pressed = False
-            self.timers["vertical move"].duration = self.down_speed
+    def idle_time(self):
+        """
+        ms of real time until the simulation has something to do (a timer firing or
+        a queued input becoming due), None if it is only waiting for input
+        """
+        due = self.simulation.scheduler.next_time()
+        if self.keyboard.queue:
+            queued = self.keyboard.queue[0][0]
+            due = queued if due is None else min(due, queued)
+        if due is None:
+            return None
+        # things only happen on the first fixed step at or after their time
+        step = self.timestep.step
+        due = -(-due // step) * step
+        return max(0, due - self.simulation.time - self.timestep.pending())
 
     def check_finished_rows(self):
-        delete_rows = []
-        for i, row in enumerate(self.field_data):
-            if all(row):
-                delete_rows.append(i)
-            
-        if delete_rows:
-            for delete_row in delete_rows:
-                for block in self.field_data[delete_row]:
-                    block.kill()  # Remove blocks from the sprite group
-
-                for row in self.field_data:
-                    for block in row:
-                        if block and block.pos.y < delete_row:
-                            block.pos.y += 1
-
-            self.field_data = [[0 for x in range(COLUMNS)] for y in range(ROWS)]  # Reset the field data
-            for block in self.sprites:
-                self.field_data[int(block.pos.y)][int(block.pos.x)] = block  # Update the field data with remaining blocks
-
-            self.calculate_score(len(delete_rows))
-
-    def run(self):
-        self.input()
-        self.timer_update()
-        self.sprites.update()
+        return self.engine.check_finished_rows()
 
+    def draw_grid(self):
+        """
+        Draws the grid lines over the field, from the overlay baked once by assets.grid_overlay
+        (colorkeyed, so only the lines are drawn). No grid when the cells are too small
+        """
+        if self.grid_surface:
+            self.surface.blit(self.grid_surface, (0, 0))
+
+    @staticmethod
+    def scroll(start, position, size, total):
+        """New start of a view of size cells so position stays away from its edges"""
+        if size >= total:
+            return 0
+        margin = size // 4
+        if start + margin <= position < start + size - margin:
+            return start
+        return min(max(position - size // 2, 0), total - size)
+
+    def follow_piece(self):
+        """Scrolls the view if the falling piece got close to its edge, returns True if it moved"""
+        board = self.engine.board
+        tetromino = self.engine.tetromino
+        view = (self.scroll(self.view_x, tetromino.x, self.view_columns, board.columns),
+                self.scroll(self.view_y, tetromino.y, self.view_rows, board.height))
+        if view == (self.view_x, self.view_y):
+            return False
+        self.view_x, self.view_y = view
+        return True
+
+    def piece_tiles(self):
+        """The cells covered by the ghost and the falling piece, with the tile each of them shows"""
+        tetromino = self.engine.tetromino
+        cells = {}
+        if not self.engine.game_over:
+            for position in self.engine.ghost_positions():
+                cells[position] = self.ghost_tiles[tetromino.color_index]
+        for position in tetromino.positions():
+            cells[position] = self.tiles[tetromino.color_index]
+        left, top = self.view_x, max(self.view_y, 0)
+        right, bottom = self.view_x + self.view_columns, self.view_y + self.view_rows
+        return {(x, y): tile for (x, y), tile in cells.items() if left <= x < right and top <= y < bottom}
+
+    def draw_blocks(self, pieces):
+        """Draws the locked cells in view straight from the engine state, then the ghost and falling piece"""
+        tiles = self.tiles
+        board = self.engine.board
+        cell = self.cell_size
+        left, top = self.view_x, self.view_y
+        view_mask = (1 << self.view_columns) - 1
+        for y in range(top, top + self.view_rows):
+            if not board.rows[y] >> left & view_mask:
+                continue
+            screen_y = (y - top) * cell
+            for x, color_index in enumerate(board.cells[y][left:left + self.view_columns]):
+                if color_index:
+                    self.surface.blit(tiles[color_index], (x * cell, screen_y))
+
+        for (x, y), tile in pieces.items():
+            self.surface.blit(tile, ((x - left) * cell, (y - top) * cell))
+
+    def draw_field(self, pieces):
+        """Redraws every cell in view"""
+        if self.raster:
+            self.raster.draw(self.engine.board, self.view_x, self.view_y, pieces)
+            return
         self.surface.fill(BLACK)
-        self.sprites.draw(self.surface)
-
+        self.draw_blocks(pieces)
         self.draw_grid()
-        self.display_surface.blit(self.surface, (PADDING, PADDING))
-        pygame.draw.rect(self.display_surface, LINE_COLOR, self.rect, 2, 2)
-
 
-class Tetromino(pygame.sprite.Sprite):
-    def __init__(self, shape, group, create_tetromino, field_data):
-        # Setup 
-        self.shape = shape
-        self.block_positions = TETROMINOS[shape]['shape']
-        self.color = TETROMINOS[shape]['color']
-        self.create_tetromino = create_tetromino
-        self.field_data = field_data
-        
-        # SRS rotation state (0, 1, 2, 3 representing 0°, 90°, 180°, 270°)
-        self.rotation_state = 0
-        
-        # Create blocks
-        self.blocks = [Block(group, pos, self.color) for pos in self.block_positions]
+    def draw_cell(self, x, y, tile):
+        """Redraws a single cell (board coordinates) including the grid lines on its edges"""
+        cell = self.cell_size
+        rect = self.surface.blit(tile, ((x - self.view_x) * cell, (y - self.view_y) * cell))
+        if self.grid_surface:
+            self.surface.blit(self.grid_surface, rect, rect)
+        return rect
 
-    def collision_horizontal_check(self, blocks, amount):
-        collision_list = [block.horizontal_collide(int(block.pos.x + amount), self.field_data) for block in self.blocks]
-        return True if any(collision_list) else False
-    
-    def collision_vertical_check(self, blocks, amount):
-        collision_list = [block.vertical_collide(int(block.pos.y + amount), self.field_data) for block in self.blocks]
-        return True if any(collision_list) else False
+    def invalidate(self):
+        """Forces a full redraw on the next frame"""
+        self.full_redraw = True
 
-    def move_down(self):
-        if not self.collision_vertical_check(self.blocks, 1):
-            for block in self.blocks:
-                block.pos.y += 1
-        else:
-            for block in self.blocks:
-                self.field_data[int(block.pos.y)][int(block.pos.x)] = block
-            self.create_tetromino()
-
-    def move_horizontal(self, amount):
-        if not self.collision_horizontal_check(self.blocks, amount):
-            for block in self.blocks:
-                block.pos.x += amount
-
-    def check_collision_at_positions(self, positions):
-        """Check if any of the given positions would cause a collision"""
-        for pos in positions:
-            # Check boundaries
-            if pos.x < 0 or pos.x >= COLUMNS or pos.y >= ROWS:
-                return True
-            
-            # Check collision with existing blocks (only if y >= 0)
-            if pos.y >= 0 and self.field_data[int(pos.y)][int(pos.x)]:
-                return True
-        
-        return False
-
-    def check_collision_at_positions(self, positions):
-        """Check if any of the given positions would cause a collision"""
-        for pos in positions:
-            # Check boundaries
-            if pos.x < 0 or pos.x >= COLUMNS or pos.y >= ROWS:
-                return True
-            
-            # Check collision with existing blocks (only if y >= 0)
-            if pos.y >= 0 and self.field_data[int(pos.y)][int(pos.x)]:
-                return True
-        
-        return False
-
-    def rotate(self):
-        """Implement Super Rotation System (SRS) rotation with wall kicks"""
-        if self.shape == "O":  # O piece doesn't rotate
-            return
-            
-        # Calculate the pivot point (center of rotation)
-        if self.shape == "I":
-            # I piece uses a different pivot calculation
-            pivot_pos = self.blocks[0].pos
-        else:
-            # Other pieces use the first block as pivot
-            pivot_pos = self.blocks[0].pos
-        
-        # Calculate new rotation state
-        new_rotation_state = (self.rotation_state + 1) % 4
-        
-        # Get the basic rotated positions
-        new_positions = [block.rotate(pivot_pos) for block in self.blocks]
-        
-        # Get wall kick data for this piece and rotation
-        kick_data = self.get_wall_kick_data(self.rotation_state, new_rotation_state)
-        
-        # Try each wall kick offset
-        for kick_offset in kick_data:
-            test_positions = [pos + pygame.Vector2(kick_offset) for pos in new_positions]
-            
-            # If this position is valid, apply the rotation
-            if not self.check_collision_at_positions(test_positions):
-                for i, block in enumerate(self.blocks):
-                    block.pos = test_positions[i]
-                self.rotation_state = new_rotation_state
-                return
-        
-        # If no wall kick worked, rotation fails (do nothing)
-
-    def rotate_counter(self):
-        """Implement Super Rotation System (SRS) rotation with wall kicks"""
-        if self.shape == "O":  # O piece doesn't rotate
-            return
-            
-        # Calculate the pivot point (center of rotation)
-        if self.shape == "I":
-            # I piece uses a different pivot calculation
-            pivot_pos = self.blocks[0].pos
+    def draw(self):
+        """
+        Draws what changed since the last frame and returns the changed screen rects.
+        Only a moving piece (or ghost): redraw the cells it left and the cells it entered.
+        Locked or cleared cells: redraw the whole field.
+        """
+        board = self.engine.board
+        if self.follow_piece():
+            self.full_redraw = True
+        pieces = self.piece_tiles()
+
+        if self.full_redraw or board.version != self.drawn_board_version:
+            self.draw_field(pieces)
+            self.display_surface.blit(self.surface, self.rect)
+            dirty = [self.rect]
+        elif pieces != self.drawn_pieces:
+            dirty = []
+            for x, y in self.drawn_pieces.keys() | pieces.keys():
+                tile = pieces.get((x, y))
+                if tile is self.drawn_pieces.get((x, y)):
+                    continue
+                rect = self.draw_cell(x, y, tile if tile else self.tiles[board.cells[y][x]])
+                self.display_surface.blit(self.surface, rect.move(self.rect.topleft), rect)
+                dirty.append(rect.move(self.rect.topleft))
         else:
-            # Other pieces use the first block as pivot
-            pivot_pos = self.blocks[0].pos
-        
-        # Calculate new rotation state
-        new_rotation_state = (self.rotation_state - 1) % 4
-        
-        # Get the basic rotated positions
-        new_positions = [block.rotate_counter(pivot_pos) for block in self.blocks]
-        
-        # Get wall kick data for this piece and rotation
-        kick_data = self.get_wall_kick_data(self.rotation_state, new_rotation_state)
-        
-        # Try each wall kick offset
-        for kick_offset in kick_data:
-            test_positions = [pos + pygame.Vector2(kick_offset) for pos in new_positions]
-            
-            # If this position is valid, apply the rotation
-            if not self.check_collision_at_positions(test_positions):
-                for i, block in enumerate(self.blocks):
-                    block.pos = test_positions[i]
-                self.rotation_state = new_rotation_state
-                return
-        
-        # If no wall kick worked, rotation fails (do nothing)
-
-    def get_wall_kick_data(self, from_state, to_state):
-        """Get wall kick offsets for SRS system"""
-        
-        # I piece has special wall kick data
-        if self.shape == "I":
-            return self.get_i_piece_wall_kicks(from_state, to_state)
-        
-        # Standard wall kick data for J, L, S, T, Z pieces
-        wall_kick_data = {
-            (0, 1): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],  # 0->R
-            (1, 2): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],      # R->2
-            (2, 3): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],     # 2->L
-            (3, 0): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],   # L->0
-            (1, 0): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],     # R->0
-            (2, 1): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],   # 2->R
-            (3, 2): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],  # L->2
-            (0, 3): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)]       # 0->L
-        }
-        
-        return wall_kick_data.get((from_state, to_state), [(0, 0)])
-
-    def get_i_piece_wall_kicks(self, from_state, to_state):
-        """Special wall kick data for I piece"""
-        i_wall_kick_data = {
-            (0, 1): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],    # 0->R
-            (1, 2): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)],    # R->2
-            (2, 3): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],    # 2->L
-            (3, 0): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],    # L->0
-            (1, 0): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],    # R->0
-            (2, 1): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],    # 2->R
-            (3, 2): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],    # L->2
-            (0, 3): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)]     # 0->L
-        }
-        
-        return i_wall_kick_data.get((from_state, to_state), [(0, 0)])
-
+            return []
 
-class Block(pygame.sprite.Sprite):
-    def __init__(self, group, pos, color):
-        # General
-        super().__init__(group)
-        self.image = pygame.Surface((CELL_SIZE,CELL_SIZE))
-        self.image.fill(color)
-        
-        # Position
-        self.pos = pygame.Vector2(pos) + OFFSET
-        self.rect = self.image.get_rect(topleft = (self.pos *CELL_SIZE))
-
-    def rotate(self, pivot_pos):
-        """Rotate the block 90 degrees clockwise around the pivot using SRS method"""
-        # Calculate relative position from pivot
-        relative_pos = self.pos - pivot_pos
-        
-        # Apply SRS rotation matrix for 90° clockwise: (x, y) -> (y, -x)
-        rotated_relative = pygame.Vector2(-relative_pos.y, relative_pos.x)
-        
-        # Return new absolute position
-        return pivot_pos + rotated_relative
-    
-    def rotate_counter(self, pivot_pos):
-        """Rotate the block 90 degrees counterclockwise around the pivot using SRS method"""
-        # Calculate relative position from pivot
-        relative_pos = self.pos - pivot_pos
-        
-        # Apply SRS rotation matrix for -90° clockwise: (x, y) -> (y, -x)
-        rotated_relative = pygame.Vector2(relative_pos.y, -relative_pos.x)
-        
-        print("counterclockwise rotation")
-
-        # Return new absolute position
-        return pivot_pos + rotated_relative
-    
-
-    def update(self):
-        """Updates the position of the block based on its pos attribute."""
-        self.rect.topleft = self.pos* CELL_SIZE
+        pygame.draw.rect(self.display_surface, LINE_COLOR, self.rect, 2, 2)
+        self.full_redraw = False
+        self.drawn_board_version = board.version
+        self.drawn_pieces = pieces
+        return dirty
 
-    def horizontal_collide(self, x, field_data):
-        if not 0 <= x < COLUMNS:
-            return True
-        if field_data[int(self.pos.y)][x]:
-            return True
-    
-    def vertical_collide(self, y, field_data):
-        if y >= ROWS:
-            return True
-        if y >= 0 and field_data[y][int(self.pos.x)]:
-            return True
\ No newline at end of file
+    def run(self):
+        self.timer_update()
+        return self.draw()
@@ -0,0 +1,190 @@
+# Hosts many independent games in one process with asyncio, for online practice rooms.
+# Every connection gets its own session: a Simulation (the same game logic Main runs)
+# on its own clock. Nothing polls: a session only runs when one of its inputs arrives
+# or when its next timer (gravity, auto shift) is due, so idle sessions cost nothing.
+# Clients send INPUT messages and get the usual ROWS/PIECE/SCORE/OVER updates back,
+# see network.py for the protocol.
+#
+# usage: python tetris_game/host.py --port 5001
+#        python tetris_game/host.py --port 5001 --load-test 500   (also connects 500 random players)
+
+import asyncio
+import socket
+from argparse import ArgumentParser
+from random import Random, getrandbits
+
+from constants import SIMULATION_STEP
+from randomizer import Randomizer, POLICIES
+from simulation import Simulation, CONTROLS
+import network
+
+MAX_BUFFERED = 64 * 1024  # bytes queued for a client that doesn't read before it is dropped
+
+
+class Session:
+    def __init__(self, writer, seed, policy = "bag"):
+        """one player's game, advanced by its inputs and its own scheduled timers"""
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.seed = seed
+        self.randomizer = Randomizer(seed, policy)
+        self.simulation = Simulation(self.randomizer.next_shape)
+        self.state_sync = network.StateSync(score = True)
+        self.held = set()
+        self.start = self.loop.time()
+        self.wakeup = None
+
+    def now(self):
+        """Game time in ms, whole simulation steps since the session started"""
+        elapsed = int((self.loop.time() - self.start) * 1000)
+        return elapsed - elapsed % SIMULATION_STEP
+
+    def advance(self):
+        self.simulation.run_until(self.now())
+
+    def schedule_wakeup(self):
+        """Arms a loop callback for the next timer of the game, replacing the previous one"""
+        if self.wakeup:
+            self.wakeup.cancel()
+            self.wakeup = None
+        due = self.simulation.scheduler.next_time()
+        if due is None or self.simulation.engine.game_over:
+            return
+        # the first whole step at or after the timer
+        due = -(-due // SIMULATION_STEP) * SIMULATION_STEP
+        self.wakeup = self.loop.call_at(self.start + due / 1000, self.wake)
+
+    def wake(self):
+        self.wakeup = None
+        self.advance()
+        self.sync()
+        self.schedule_wakeup()
+
+    def handle_input(self, payload):
+        control, pressed = network.INPUT_FORMAT.unpack(payload)
+        if control >= len(CONTROLS):
+            return
+        self.advance()
+        if pressed:
+            self.held.add(CONTROLS[control])
+        else:
+            self.held.discard(CONTROLS[control])
+        self.simulation.set_held(self.held)
+        self.sync()
+        self.schedule_wakeup()
+
+    def sync(self):
+        """
+        Sends what changed. Once the game is over (usually from gravity, in wake) the
+        connection is closed after OVER went out, that also ends the client's read loop
+        """
+        writer = self.writer
+        engine = self.simulation.engine
+        for kind, payload in self.state_sync.messages(engine):
+            writer.write(network.encode(kind, payload))
+        if engine.game_over or writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            writer.close()
+
+    def close(self):
+        if self.wakeup:
+            self.wakeup.cancel()
+            self.wakeup = None
+
+
+class Host:
+    def __init__(self, policy = "bag"):
+        """runs every session on one event loop, no thread per session"""
+        self.policy = policy
+        self.sessions = set()
+        self.finished = 0  # sessions that ended, by game over or disconnect
+
+    async def handle_client(self, reader, writer):
+        session = Session(writer, getrandbits(64), self.policy)
+        self.sessions.add(session)
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            writer.write(network.encode(network.START, network.START_FORMAT.pack(session.seed, 0)))
+            session.sync()
+            session.schedule_wakeup()
+            while not session.simulation.engine.game_over:
+                header = await reader.readexactly(network.FRAME.size)
+                kind, length = network.FRAME.unpack(header)
+                payload = await reader.readexactly(length)
+                if kind == network.INPUT:
+                    if length != network.INPUT_FORMAT.size:
+                        break  # not a client that speaks the protocol, drop it
+                    session.handle_input(payload)
+                await writer.drain()
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            session.close()
+            self.sessions.discard(session)
+            self.finished += 1
+            writer.close()
+
+    async def serve(self, host, port):
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+async def random_player(host, port, seed, think_time = 0.05):
+    """Load test client: presses random controls until its game is over, returns the messages it got"""
+    random = Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    frames = network.FrameReader()
+    received = 0
+    over = False
+
+    async def read():
+        nonlocal received, over
+        while not over:
+            try:
+                data = await reader.read(4096)
+            except ConnectionError:
+                return
+            if not data:
+                return
+            for kind, _ in frames.feed(data):
+                received += 1
+                over = over or kind == network.OVER
+
+    reading = asyncio.create_task(read())
+    try:
+        while not over and not reading.done():
+            control = random.randrange(len(CONTROLS))
+            writer.write(network.encode(network.INPUT, network.INPUT_FORMAT.pack(control, 1)))
+            writer.write(network.encode(network.INPUT, network.INPUT_FORMAT.pack(control, 0)))
+            await writer.drain()
+            await asyncio.sleep(random.uniform(0, 2 * think_time))
+    except ConnectionError:
+        pass
+    await reading
+    writer.close()
+    return received
+
+
+async def main(args):
+    host = Host(args.randomizer)
+    server = await host.serve(args.host, args.port)
+    address = server.sockets[0].getsockname()
+    print(f"hosting on {address[0]}:{address[1]}")
+    async with server:
+        if not args.load_test:
+            await server.serve_forever()
+            return
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        received = await asyncio.gather(*(random_player(address[0], address[1], i) for i in range(args.load_test)))
+        elapsed = loop.time() - start
+        print(f"{args.load_test} concurrent games in {elapsed:.1f}s, {sum(received)} messages sent to the players")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Host many headless games in one process")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--randomizer", choices=POLICIES, default="bag", help="how the piece sequences are generated")
+    parser.add_argument("--load-test", type=int, default=0, metavar="N", help="connect N random players and report how it went")
+    args = parser.parse_args()
+    asyncio.run(main(args))
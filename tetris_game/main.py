@@ -1,33 +1,94 @@
+from time import perf_counter
+STARTED = perf_counter()
+
+import pygame
 from constants import *
 from sys import exit
 from game import Game
 from score import Score
 from preview import Preview
 
-from random import choice
+from math import ceil
+from argparse import ArgumentParser
+from replay import Recording
+from randomizer import Randomizer, POLICIES
+from rewind import GameState, History
+from profiler import FrameProfiler, NullProfiler, StartupTimer
+from telemetry import Telemetry
+from finesse import FinesseCheck, load as load_finesse
 
 class Main:
-    def __init__(self):
+    def __init__(self, dirty_rects = True, seed = None, record = None, profile = False, das = DAS, arr = ARR, vsync = False, startup_report = False, policy = "bag", window_size = (WINDOW_WIDTH, WINDOW_HEIGHT), practice = False, columns = COLUMNS, rows = ROWS, renderer = "tiles", telemetry = None, finesse = False):
         """
         has all general stuff for the game
-        such as the window, clock, and display surface
+        such as the window, clock, and display surface.
+        with dirty_rects only the parts of the window that changed are redrawn and
+        pushed to the display, otherwise the whole frame is redrawn every time.
+        seed makes the piece sequence reproducible, record is a path the session
+        is saved to (see replay.py) when the window is closed, policy picks
+        the randomizer (see randomizer.py).
+        profile times every phase of every frame (F3 shows them, F4 exports a trace).
+        das and arr are the auto shift delay and auto repeat rate in ms.
+        vsync paces frames to the display refresh instead of the MAX_FPS cap
+        (if the driver supports it).
+        When nothing on screen changes the loop sleeps until the next input or game tick.
+        startup_report prints how long each step up to the first frame took.
+        window_size leaves room for extra panels (see versus.py).
+        practice turns on undo (backspace goes back one piece) and a save state (F5 save, F9 load).
+        columns and rows set the board size, big boards are scaled down and scrolled (see Game)
+        renderer picks how the field is redrawn, "tiles" or "array" (see Game)
+        telemetry is a directory gameplay events are written to (see telemetry.py)
+        finesse counts the inputs over the fewest that would place each piece and shows them (see finesse.py)
         """
-        pygame.init()
-        self.display_surface = pygame.display.set_mode((WINDOW_WIDTH,WINDOW_HEIGHT))
+        if practice and record:
+            raise ValueError("practice sessions can't be recorded, undo would break the replay")
+        self.startup = StartupTimer(STARTED)
+        self.startup_report = startup_report
+        self.startup.mark("import")
+        # only the modules the game uses, pygame.init() also opens audio and joysticks
+        pygame.display.init()
+        pygame.font.init()
+        self.startup.mark("init")
+        self.vsync = False
+        if vsync:
+            try:
+                self.display_surface = pygame.display.set_mode(window_size, pygame.SCALED, vsync=1)
+                self.vsync = True
+            except pygame.error:
+                pass
+        if not self.vsync:
+            self.display_surface = pygame.display.set_mode(window_size)
+        self.startup.mark("window")
         self.clock = pygame.time.Clock()
+        self.pending_events = []  # taken off the queue while waiting for work
         pygame.display.set_caption("Tetris")
+        self.dirty_rects = dirty_rects
+        self.full_redraw = True
+        self.profiler = FrameProfiler() if profile else NullProfiler()
         
-        self.next_shapes = []
-        self.current_bag = list(TETROMINOS.keys())
+        self.randomizer = Randomizer(seed, policy)
+        self.seed = self.randomizer.seed
+        self.record_path = record
+        self.recording = Recording(self.seed) if record else None
+
+        self.telemetry = Telemetry(telemetry) if telemetry else None
+        if self.telemetry:
+            self.telemetry.session_start(self.seed, policy, das, arr, columns, rows)
 
-        for _ in range(3):  # Pre-fill the next shapes with 3 random tetrominos
-            x  = choice(self.current_bag)  # Randomly select a shape from the bag
-            self.next_shapes.append(x)
-            self.current_bag.remove(x)
+        self.finesse = FinesseCheck(load_finesse(columns = columns)) if finesse else None
 
-        self.game = Game(self.get_next_shape, self.update_score )  # Initialize the game overlay
-        self.score = Score() # Initialize the score display
+        self.game = Game(self.get_next_shape, self.update_score, self.recording, das, arr, columns, rows, renderer, self.telemetry, self.finesse)  # Initialize the game overlay
+        self.score = Score(finesse) # Initialize the score display
         self.preview = Preview() # Initialize the preview display
+        self.panels = [self.game, self.score, self.preview]
+
+        # practice mode
+        self.history = History(REWIND_PIECES) if practice else None
+        self.history_pieces = None
+        self.saved_state = None
+        self.startup.mark("game")
+        if profile:
+            self.profiler.metrics["input latency"] = self.game.keyboard.latency_percentiles
 
         
         
@@ -38,15 +99,80 @@ class Main:
             self.score.level = level
 
     def get_next_shape(self):
-        if not self.current_bag:
-            self.current_bag = list(TETROMINOS.keys())  # Reset the bag if empty
-        
-        next_shape = self.next_shapes.pop(0)  # Get the next shape 
-        x  = choice(self.current_bag)  # Randomly select a shape from the bag
-        self.next_shapes.append(x)
-        self.current_bag.remove(x)  # Remove the selected shape from the bag
-        return next_shape
-        
+        return self.randomizer.next_shape()
+
+    @property
+    def next_shapes(self):
+        return self.randomizer.queue
+
+    def handle_event(self, event):
+        #window was covered or restored, everything has to be pushed again
+        if event.type == pygame.WINDOWEXPOSED:
+            self.full_redraw = True
+        self.profiler.handle_event(event)
+        self.game.handle_event(event)
+        if self.history is not None and event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_BACKSPACE:
+                state = self.history.undo()
+                if state:
+                    self.restore(state)
+            elif event.key == pygame.K_F5:
+                self.saved_state = self.snapshot()
+            elif event.key == pygame.K_F9 and self.saved_state:
+                self.restore(self.saved_state)
+                self.history.push(self.saved_state)
+
+    def update(self):
+        self.game.timer_update()
+        if self.finesse:
+            self.score.finesse = self.finesse.faults
+        # one history entry per piece, taken when it spawns
+        if self.history is not None and self.game.engine.pieces != self.history_pieces:
+            self.history_pieces = self.game.engine.pieces
+            self.history.push(self.snapshot())
+
+    def snapshot(self):
+        return GameState(self.game.simulation.snapshot(), self.randomizer.snapshot())
+
+    def restore(self, state):
+        simulation = self.game.simulation
+        simulation.restore(state.simulation)
+        self.randomizer.restore(state.randomizer)
+        # the keyboard did not go back in time
+        simulation.set_held(self.game.keyboard.held)
+        self.history_pieces = simulation.engine.pieces
+
+    def draw_extra(self):
+        """Panels other than game, score and preview, returns the changed screen rects"""
+        return []
+
+    def quit(self):
+        if self.recording:
+            self.recording.finish(self.game.simulation)
+            self.recording.save(self.record_path)
+        if self.telemetry:
+            self.telemetry.session_end(self.game.simulation.time, self.game.engine)
+            self.telemetry.close()
+        pygame.quit()
+        exit()
+
+    def wait_for_work(self, timeout):
+        """
+        Blocks until an event arrives or timeout ms have passed (forever if timeout is None),
+        the event is kept for the next frame so input is handled right away
+        """
+        if timeout is None:
+            event = pygame.event.wait()
+        elif timeout > 0:
+            event = pygame.event.wait(ceil(timeout))
+        else:
+            return
+        if event.type != pygame.NOEVENT:
+            # pygame doesn't say when it happened, but it woke us up so that is now
+            event.timestamp = pygame.time.get_ticks()
+            self.pending_events.append(event)
+        self.clock.tick()
+
     def run(self):
         """
         Runs the main loop of the game.
@@ -54,23 +180,80 @@ class Main:
         """
         #runs perpetual while loop until false or exited 
         while True:
+            profiler = self.profiler
+            profiler.begin_frame()
+            frame_start = perf_counter()
             #takes in user inputs
-            for event in pygame.event.get(): 
+            events = self.pending_events + pygame.event.get()
+            self.pending_events = []
+            for event in events:
                 #quits the game
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
-            #background color
-            self.display_surface.fill((GRAY))
-            self.game.run()
-            self.score.run()
-            self.preview.run(self.next_shapes)
+                    self.quit()
+                self.handle_event(event)
+            profiler.mark("event pump")
+
+            self.update()
+            profiler.mark("timer update")
+
+            if self.full_redraw or not self.dirty_rects:
+                #background color
+                self.display_surface.fill((GRAY))
+                for panel in self.panels:
+                    panel.invalidate()
+
+            dirty = self.game.draw()
+            profiler.mark("draw game")
+            dirty += self.score.run()
+            profiler.mark("draw score")
+            dirty += self.preview.run(self.next_shapes)
+            profiler.mark("draw preview")
+            dirty += self.draw_extra()
+            profiler.mark("draw other")
+            dirty += profiler.draw(self.display_surface, self.game)
+
             #updates the display surface
-            pygame.display.update()
-            #updates the clock
-            self.clock.tick(100) #100 FPS
+            idle = not dirty and not self.full_redraw and self.dirty_rects
+            if self.full_redraw or not self.dirty_rects:
+                pygame.display.update()
+                self.full_redraw = False
+            elif dirty:
+                pygame.display.update(dirty)
+            self.game.keyboard.presented(pygame.time.get_ticks())
+            profiler.mark("display update")
+            if self.telemetry:
+                self.telemetry.frame(self.game.simulation.time, (perf_counter() - frame_start) * 1000)
+            if self.startup:
+                self.startup.mark("first frame")
+                if self.startup_report:
+                    print(self.startup.report())
+                self.startup = None
+            #updates the clock, or sleeps if the screen is static
+            if idle:
+                self.wait_for_work(self.game.idle_time())
+            else:
+                self.clock.tick(0 if self.vsync else MAX_FPS)
+            profiler.mark("clock tick")
+            profiler.end_frame()
             
 
 if __name__ == "__main__":
-    main = Main()
+    parser = ArgumentParser(description="Tetris")
+    parser.add_argument("--seed", type=int, help="seed for the piece sequence (taken mod 2**64)")
+    parser.add_argument("--record", metavar="PATH", help="save the session as a replay file on exit")
+    parser.add_argument("--profile", action="store_true", help="time every frame phase (F3: overlay, F4: export frame_trace.json)")
+    parser.add_argument("--das", type=int, default=DAS, help="delayed auto shift in ms")
+    parser.add_argument("--arr", type=int, default=ARR, help="auto repeat rate in ms, 0 moves straight to the wall")
+    parser.add_argument("--vsync", action="store_true", help="sync frames to the display refresh")
+    parser.add_argument("--startup-report", action="store_true", help="print how long startup took")
+    parser.add_argument("--practice", action="store_true", help="backspace undoes a piece, F5/F9 save and load a state")
+    parser.add_argument("--columns", type=int, default=COLUMNS, help="board width in cells")
+    parser.add_argument("--rows", type=int, default=ROWS, help="board height in cells")
+    parser.add_argument("--renderer", choices=("tiles", "array"), default="tiles", help="how the field is drawn, array needs numpy")
+    parser.add_argument("--telemetry", metavar="DIR", help="write gameplay events to DIR for tuning")
+    parser.add_argument("--finesse", action="store_true", help="count inputs over the fewest possible for each piece")
+    parser.add_argument("--randomizer", choices=POLICIES, default="bag", help="how the piece sequence is generated")
+    args = parser.parse_args()
+
+    main = Main(seed = args.seed, record = args.record, profile = args.profile, das = args.das, arr = args.arr, vsync = args.vsync, startup_report = args.startup_report, policy = args.randomizer, practice = args.practice, columns = args.columns, rows = args.rows, renderer = args.renderer, telemetry = args.telemetry, finesse = args.finesse)
     main.run()
\ No newline at end of file
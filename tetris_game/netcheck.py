@@ -0,0 +1,120 @@
+# Loopback checks for the versus protocol in network.py: row sync at odd and even widths,
+# frames split over several reads, and messages relayed by a real Server on a free port.
+# Run it after changing the protocol, it exits with 1 if a check failed.
+#
+# usage: python tetris_game/netcheck.py
+
+import sys
+from random import Random
+from threading import Thread
+
+from engine import Board, Engine, SHAPES
+import network
+
+
+def random_cells(random, columns, rows, fill = 0.5):
+    return [bytes(random.randrange(1, len(SHAPES) + 2) if random.random() < fill else 0 for _ in range(columns))
+            for _ in range(rows)]
+
+
+def check_rows():
+    """RowDelta.diff and apply_rows give back the same rows, and only send the ones that changed"""
+    random = Random(1)
+    for columns in (9, 10, 11):
+        rows = 20
+        delta = network.RowDelta(columns, rows)
+        received = [bytearray(columns) for _ in range(rows)]
+        for _ in range(20):
+            cells = random_cells(random, columns, rows)
+            network.apply_rows(delta.diff(cells), received)
+            if [bytes(row) for row in received] != cells:
+                return f"rows differ after a round trip at width {columns}"
+            if delta.diff(cells) is not None:
+                return f"unchanged rows were sent again at width {columns}"
+            changed = list(cells)
+            y = random.randrange(rows)
+            changed[y] = bytes(len(SHAPES) + 1 - cell for cell in changed[y])
+            payload = delta.diff(changed)
+            if payload is None or len(payload) != 1 + (columns + 1) // 2:
+                return f"a single changed row was not sent alone at width {columns}"
+            network.apply_rows(payload, received)
+            if [bytes(row) for row in received] != changed:
+                return f"rows differ after a single row update at width {columns}"
+
+
+def check_frames():
+    """FrameReader puts messages back together however the stream is split"""
+    random = Random(2)
+    messages = [(network.ROWS, bytes(random.randrange(256) for _ in range(random.randrange(40))))
+                for _ in range(30)]
+    messages += [(network.OVER, b''), (network.GARBAGE, bytes([3]))]
+    stream = b''.join(network.encode(kind, payload) for kind, payload in messages)
+
+    for chunk_sizes in ([1], [2, 3], [7, 1, 50]):
+        reader = network.FrameReader()
+        received = []
+        pos = 0
+        i = 0
+        while pos < len(stream):
+            size = chunk_sizes[i % len(chunk_sizes)]
+            received += reader.feed(stream[pos:pos + size])
+            pos += size
+            i += 1
+        if received != messages:
+            return f"messages differ when the stream is read in chunks of {chunk_sizes}"
+
+
+def check_match():
+    """Two clients on a loopback server: same seed, garbage is relayed, a board syncs over StateSync"""
+    server = network.Server('127.0.0.1', 0)
+    relay = Thread(target = server.serve_match, args = (1234,), daemon = True)
+    relay.start()
+    players = [network.Connection(*server.address) for _ in range(2)]
+    try:
+        starts = [player.wait_start() for player in players]
+        if starts != [(1234, 0), (1234, 1)]:
+            return f"unexpected START messages {starts}"
+
+        players[0].send(network.GARBAGE, bytes([4]))
+        message = players[1].receive()
+        if message != (network.GARBAGE, bytes([4])):
+            return f"garbage arrived as {message}"
+
+        # player 1 plays a few pieces, player 0 rebuilds the board from its messages
+        random = Random(3)
+        engine = Engine(lambda: random.choice(SHAPES))
+        state_sync = network.StateSync()
+        sent = 0
+        while engine.pieces < 8:
+            engine.move_horizontal(random.choice((-1, 1)))
+            engine.hard_drop()
+            for kind, payload in state_sync.messages(engine):
+                players[1].send(kind, payload)
+                sent += 1
+        board = Board()
+        cells = [bytearray(board.columns) for _ in range(board.height)]
+        for _ in range(sent):
+            kind, payload = players[0].receive()
+            if kind == network.ROWS:
+                network.apply_rows(payload, cells)
+        if [bytes(row) for row in cells] != list(engine.board.cells):
+            return "the opponent's board differs from the one that was sent"
+    finally:
+        for player in players:
+            player.close()
+        relay.join(5)
+        server.close()
+    if relay.is_alive():
+        return "the server kept relaying after both players left"
+
+
+CHECKS = [check_rows, check_frames, check_match]
+
+
+if __name__ == "__main__":
+    failed = 0
+    for check in CHECKS:
+        error = check()
+        failed += error is not None
+        print(f"{'ok    ' if error is None else 'FAILED'} {check.__name__}{': ' + error if error else ''}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,242 @@
+# Game state over TCP, without any pygame dependency.
+# Used by two player versus (the server pairs two clients, tells both the seed of the match
+# and then only relays bytes between them, every client runs its own game) and by the
+# multi-session host (host.py, the games run on the server and clients only send inputs).
+# Whoever runs a game sends what the other side needs to draw it: the board rows that
+# changed since the last update and the falling piece.
+#
+# Message layout (little endian): type (u8), payload length (u16), payload
+#   START    server -> client: seed (u64), player number (u8)
+#   ROWS     per changed row: y (u8), then 4 bits per cell (color index, 0 = empty)
+#   PIECE    shape index (u8, 255 = no piece), x (i8), y (i8), rotation state (u8)
+#   GARBAGE  lines (u8) the sender's clears attack with
+#   OVER     the sender topped out
+#   INPUT    client -> host: control (u8, index into simulation.CONTROLS), pressed (u8)
+#   SCORE    score (u64), lines (u32), level (u32)
+#
+# usage: python tetris_game/network.py --host 0.0.0.0 --port 5000
+
+import socket
+import struct
+from argparse import ArgumentParser
+from random import getrandbits
+from selectors import DefaultSelector, EVENT_READ
+
+from constants import COLUMNS, ROWS as FIELD_ROWS
+from engine import SHAPES
+
+START = 1
+ROWS = 2
+PIECE = 3
+GARBAGE = 4
+OVER = 5
+INPUT = 6
+SCORE = 7
+
+FRAME = struct.Struct('<BH')
+START_FORMAT = struct.Struct('<QB')
+PIECE_FORMAT = struct.Struct('<BbbB')
+INPUT_FORMAT = struct.Struct('<BB')
+SCORE_FORMAT = struct.Struct('<QII')
+NO_PIECE = 255
+DEFAULT_PORT = 5000
+
+
+def encode(kind, payload = b''):
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+class FrameReader:
+    def __init__(self):
+        """splits a byte stream back into (type, payload) messages"""
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Adds received bytes, returns the messages that are complete now"""
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        pos = 0
+        while len(buffer) - pos >= FRAME.size:
+            kind, length = FRAME.unpack_from(buffer, pos)
+            end = pos + FRAME.size + length
+            if end > len(buffer):
+                break
+            messages.append((kind, bytes(buffer[pos + FRAME.size:end])))
+            pos = end
+        del buffer[:pos]
+        return messages
+
+
+def pack_row(cells):
+    """Two cells per byte, color indices fit in 4 bits"""
+    if len(cells) % 2:
+        cells = bytes(cells) + b'\0'
+    return bytes(cells[i] << 4 | cells[i + 1] for i in range(0, len(cells), 2))
+
+
+def unpack_row(data, columns):
+    cells = bytearray(columns)
+    for i, byte in enumerate(data):
+        cells[2 * i] = byte >> 4
+        if 2 * i + 1 < columns:
+            cells[2 * i + 1] = byte & 15
+    return cells
+
+
+class RowDelta:
+    def __init__(self, columns, rows):
+        """remembers the rows the opponent has, so only changed rows are sent"""
+        self.columns = columns
+        self.sent = [bytes(columns) for _ in range(rows)]
+
+    def diff(self, cells):
+        """Payload of a ROWS message for every row that changed, None if nothing did"""
+        payload = bytearray()
+        for y, row in enumerate(cells):
+            if row != self.sent[y]:
+                self.sent[y] = bytes(row)
+                payload.append(y)
+                payload += pack_row(row)
+        return bytes(payload) if payload else None
+
+
+def apply_rows(payload, cells):
+    """Writes the rows of a ROWS message into cells (a list of bytearrays)"""
+    columns = len(cells[0])
+    row_size = (columns + 1) // 2
+    for pos in range(0, len(payload), row_size + 1):
+        y = payload[pos]
+        cells[y] = unpack_row(payload[pos + 1:pos + 1 + row_size], columns)
+
+
+class StateSync:
+    def __init__(self, columns = COLUMNS, rows = FIELD_ROWS, score = False):
+        """
+        what the other side has seen of a game, messages() returns what it is missing.
+        score also sends score, lines and level
+        """
+        self.row_delta = RowDelta(columns, rows)
+        self.score = score
+        self.sent_version = None
+        self.sent_piece = None
+        self.sent_score = None
+        self.sent_over = False
+
+    def messages(self, engine):
+        """(type, payload) for everything that changed since the last call"""
+        messages = []
+        if engine.board.version != self.sent_version:
+            self.sent_version = engine.board.version
+            payload = self.row_delta.diff(engine.board.cells)
+            if payload:
+                messages.append((ROWS, payload))
+
+        tetromino = engine.tetromino
+        if engine.game_over:
+            piece = (NO_PIECE, 0, 0, 0)
+        else:
+            piece = (SHAPES.index(tetromino.shape), tetromino.x, tetromino.y, tetromino.rotation_state)
+        if piece != self.sent_piece:
+            self.sent_piece = piece
+            messages.append((PIECE, PIECE_FORMAT.pack(*piece)))
+
+        if self.score:
+            score = (engine.current_score, engine.current_lines, engine.current_level)
+            if score != self.sent_score:
+                self.sent_score = score
+                messages.append((SCORE, SCORE_FORMAT.pack(*score)))
+
+        if engine.game_over and not self.sent_over:
+            self.sent_over = True
+            messages.append((OVER, b''))
+        return messages
+
+
+class Connection:
+    def __init__(self, host, port = DEFAULT_PORT):
+        """a client's connection to the server"""
+        self.socket = socket.create_connection((host, port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = FrameReader()
+        self.pending = []
+
+    def send(self, kind, payload = b''):
+        self.socket.sendall(encode(kind, payload))
+
+    def receive(self):
+        """Blocks until a message arrives, returns (type, payload) or None once the connection closed"""
+        while not self.pending:
+            data = self.socket.recv(4096)
+            if not data:
+                return None
+            self.pending = self.reader.feed(data)
+        return self.pending.pop(0)
+
+    def wait_start(self):
+        """Blocks until the server found an opponent, returns (seed, player number)"""
+        message = self.receive()
+        if message is None or message[0] != START:
+            raise ConnectionError("server closed the connection before the match started")
+        return START_FORMAT.unpack(message[1])
+
+    def close(self):
+        self.socket.close()
+
+
+class Server:
+    def __init__(self, host = '127.0.0.1', port = DEFAULT_PORT):
+        """port 0 picks a free port, address has the one that is actually used"""
+        self.socket = socket.create_server((host, port))
+        self.address = self.socket.getsockname()
+
+    def accept(self):
+        connection, _ = self.socket.accept()
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return connection
+
+    def serve_match(self, seed = None):
+        """Waits for two players, starts their match and relays until one of them leaves"""
+        players = [self.accept(), self.accept()]
+        seed = seed if seed is not None else getrandbits(64)
+        for number, player in enumerate(players):
+            player.sendall(encode(START, START_FORMAT.pack(seed, number)))
+
+        selector = DefaultSelector()
+        for number, player in enumerate(players):
+            selector.register(player, EVENT_READ, players[1 - number])
+        try:
+            while True:
+                for key, _ in selector.select():
+                    try:
+                        data = key.fileobj.recv(65536)
+                    except ConnectionError:
+                        data = b''
+                    if not data:
+                        return
+                    key.data.sendall(data)
+        finally:
+            selector.close()
+            for player in players:
+                player.close()
+
+    def serve_forever(self):
+        while True:
+            self.serve_match()
+
+    def close(self):
+        self.socket.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Versus server: pairs two players at a time and relays their games")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on, 0.0.0.0 for the LAN")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    server = Server(args.host, args.port)
+    print(f"listening on {server.address[0]}:{server.address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
@@ -1,6 +1,6 @@
+import pygame
 from constants import * 
-from pygame.image import load
-from os import path
+import assets
 
 class Preview:
     def __init__(self):
@@ -10,13 +10,18 @@ class Preview:
         self.surface = pygame.Surface((SIDE_BAR_WIDTH, BORDER_HEIGHT * PREVIEW_HEIGHT)) 
         self.rect = self.surface.get_rect(topright=(WINDOW_WIDTH - PADDING, PADDING))
 
-        # shapes
-        self.shape_surfaces = {shape: load(path.join('graphics',f"{shape}.png")).convert_alpha() for shape in TETROMINOS.keys()}
+        # shapes, loaded on the first draw
+        self.shape_surfaces = None
 
         # image position data
         self.increment_height = self.surface.get_height() / 3
 
+        # shapes currently on screen, only redraw when the queue shifts
+        self.drawn = None
+
     def display_pieces(self, shapes):
+        if self.shape_surfaces is None:
+            self.shape_surfaces = assets.shape_sprites()
         for i, shape in enumerate(shapes):
             shape_surface = self.shape_surfaces[shape]
             x = self.surface.get_width() / 2
@@ -24,8 +29,18 @@ class Preview:
             rect = shape_surface.get_rect(center = (x,y))
             self.surface.blit(shape_surface,rect)
 
+    def invalidate(self):
+        """Forces a full redraw on the next frame"""
+        self.drawn = None
+
     def run(self, next_shapes):
+        """Draws the preview panel if the queue changed, returns the changed screen rects"""
+        if tuple(next_shapes) == self.drawn:
+            return []
+        self.drawn = tuple(next_shapes)
+
         self.surface.fill(BLACK)
         self.display_pieces(next_shapes)
         self.display_surface.blit(self.surface, self.rect)
-        pygame.draw.rect(self.display_surface, LINE_COLOR, self.rect, 2, 2)
\ No newline at end of file
+        pygame.draw.rect(self.display_surface, LINE_COLOR, self.rect, 2, 2)
+        return [self.rect]
@@ -0,0 +1,188 @@
+# Frame profiler: times every phase of the main loop into a fixed size ring buffer,
+# shows p50/p99 per phase in an overlay and exports Chrome trace files
+# (open them in chrome://tracing or https://ui.perfetto.dev).
+
+import json
+from time import perf_counter
+
+import pygame
+from constants import *
+import assets
+
+PHASES = (
+    "event pump",
+    "timer update",
+    "draw game",
+    "draw score",
+    "draw preview",
+    "draw other",
+    "display update",
+    "clock tick",
+)
+
+
+class StartupTimer:
+    def __init__(self, start):
+        """
+        times the steps from start (a perf_counter value, taken before pygame is imported)
+        to the first frame on screen
+        """
+        self.last = start
+        self.start = start
+        self.phases = []
+
+    def mark(self, phase):
+        now = perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        lines = [f"{phase:<16} {duration:8.1f} ms" for phase, duration in self.phases]
+        lines.append(f"{'total':<16} {(self.last - self.start) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+class NullProfiler:
+    """Used when profiling is off, so the main loop doesn't need an if around every mark"""
+    enabled = False
+
+    def begin_frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def handle_event(self, event):
+        return False
+
+    def draw(self, display_surface, game):
+        return []
+
+
+class FrameProfiler:
+    enabled = True
+
+    def __init__(self, size = 1000, phases = PHASES):
+        """
+        keeps the duration of every phase of the last size frames. mark(phase) ends
+        the phase that started at the previous mark (or at begin_frame)
+        """
+        self.size = size
+        self.phases = phases
+        self.samples = {phase: [0.0] * size for phase in phases}  # milliseconds
+        self.frame_starts = [0.0] * size  # seconds, perf_counter
+        self.index = 0
+        self.count = 0
+        self.last = 0.0
+
+        # other numbers to show in the overlay: name -> function returning (p50, p99)
+        self.metrics = {}
+
+        # overlay
+        self.visible = False
+        self.restore = False
+        self.font = None
+        self.overlay_rect = pygame.Rect(PADDING, PADDING, BORDER_WIDTH, 44 + 18 * len(phases))
+        self.overlay_surface = None
+        self.overlay_time = 0.0
+
+    def begin_frame(self):
+        self.last = perf_counter()
+        self.frame_starts[self.index] = self.last
+        for phase in self.phases:
+            self.samples[phase][self.index] = 0.0
+
+    def mark(self, phase):
+        now = perf_counter()
+        self.samples[phase][self.index] += (now - self.last) * 1000
+        self.last = now
+
+    def end_frame(self):
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def percentiles(self, phase, percentiles = (50, 99)):
+        """Percentiles of a phase over the frames in the buffer, in milliseconds"""
+        if not self.count:
+            return [0.0 for _ in percentiles]
+        values = sorted(self.samples[phase][i] for i in self.ordered_frames())
+        return [values[min(self.count - 1, self.count * p // 100)] for p in percentiles]
+
+    def ordered_frames(self):
+        """Buffer indices from the oldest to the newest frame"""
+        start = self.index - self.count
+        return [(start + i) % self.size for i in range(self.count)]
+
+    def export_chrome_trace(self, path):
+        """Writes the buffered frames as complete ('X') events in the Chrome trace event format"""
+        events = []
+        for i in self.ordered_frames():
+            start = self.frame_starts[i]
+            for phase in self.phases:
+                duration = self.samples[phase][i]
+                events.append({
+                    "name": phase,
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": duration * 1000,
+                    "pid": 1,
+                    "tid": 1,
+                })
+                start += duration / 1000
+        with open(path, 'w') as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def handle_event(self, event):
+        """F3 toggles the overlay, F4 exports the trace"""
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_F3:
+                self.visible = not self.visible
+                self.restore = not self.visible
+                self.overlay_surface = None
+                return True
+            if event.key == pygame.K_F4:
+                self.export_chrome_trace('frame_trace.json')
+                return True
+        return False
+
+    def render_overlay(self):
+        if not self.font:
+            self.font = assets.font(14)
+        surface = pygame.Surface(self.overlay_rect.size)
+        surface.set_alpha(190)
+
+        columns = (6, 170, 250)
+        y = 4
+        for x, text in zip(columns, ("phase", "p50 ms", "p99 ms")):
+            surface.blit(self.font.render(text, True, WHITE), (x, y))
+        rows = [(phase, self.percentiles(phase)) for phase in self.phases]
+        rows += [(name, metric()) for name, metric in self.metrics.items()]
+        for name, values in rows:
+            y += 18
+            for x, text in zip(columns, (name, *(f"{value:.2f}" for value in values))):
+                surface.blit(self.font.render(text, True, WHITE), (x, y))
+        return surface
+
+    def draw(self, display_surface, game):
+        """
+        Draws the overlay on top of the game field, returns the changed screen rects.
+        The field underneath is restored from the game surface first so this works with dirty rects.
+        The numbers are re-rendered 4 times a second, text rendering every frame would show up in them
+        """
+        if not self.visible and not self.restore:
+            return []
+        display_surface.fill(GRAY, self.overlay_rect)
+        display_surface.blit(game.surface, self.overlay_rect, self.overlay_rect.move(-game.rect.x, -game.rect.y))
+        if self.restore:
+            self.restore = False
+            return [self.overlay_rect]
+
+        now = perf_counter()
+        if not self.overlay_surface or now - self.overlay_time > 0.25:
+            self.overlay_surface = self.render_overlay()
+            self.overlay_time = now
+        display_surface.blit(self.overlay_surface, self.overlay_rect)
+        return [self.overlay_rect]
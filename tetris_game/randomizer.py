@@ -0,0 +1,128 @@
+# Piece sequences. A seed and a policy always give the same pieces, in any process,
+# so games can be replayed and agents compared on exactly the same stream.
+#
+#   Randomizer(seed, policy, lookahead)  -> next_shape() for the engine, queue holds the upcoming pieces
+#   bulk(count, seed, policy)            -> numpy array of shape indices, for batch simulation
+#
+# bulk() uses numpy's generator for the bag and random policies, so for those its stream
+# is not the same as Randomizer's for the same seed.
+
+from collections import deque
+from itertools import islice
+from random import Random, getrandbits
+
+from engine import SHAPES
+
+SEED_RANGE = 1 << 64  # seeds are stored as u64
+
+
+def seven_bag(random):
+    """Every shape once per bag of 7, in random order"""
+    while True:
+        bag = list(SHAPES)
+        random.shuffle(bag)
+        yield from bag
+
+
+def pure_random(random):
+    """Every shape equally likely every time"""
+    while True:
+        yield random.choice(SHAPES)
+
+
+def history(random, size = 4, rolls = 4):
+    """
+    TGM style: rerolls up to rolls times while the shape is one of the last size shapes.
+    Never starts with an S, Z or O
+    """
+    recent = deque("Z" * size, maxlen=size)
+    shape = random.choice("IJLT")
+    while True:
+        recent.append(shape)
+        yield shape
+        for _ in range(rolls):
+            shape = random.choice(SHAPES)
+            if shape not in recent:
+                break
+
+
+POLICIES = {
+    "bag": seven_bag,
+    "random": pure_random,
+    "history": history,
+}
+
+
+class Randomizer:
+    def __init__(self, seed = None, policy = "bag", lookahead = 3):
+        """
+        queue always holds the next lookahead shapes, it is what the preview
+        and lookahead bots look at. Every generated shape is kept, so going back
+        to an earlier point (snapshot/restore) replays exactly the same shapes.
+        Seeds are taken mod 2**64, so any int works and still fits in a replay
+        header or a START message
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy}, expected one of {', '.join(POLICIES)}")
+        self.seed = seed % SEED_RANGE if seed is not None else getrandbits(64)
+        self.policy = policy
+        self.lookahead = lookahead
+        self.sequence = POLICIES[policy](Random(self.seed))
+        self.generated = []
+        self.position = 0  # index of the next shape handed out
+        self.queue = deque(self.shape_at(i) for i in range(lookahead))
+
+    def shape_at(self, index):
+        generated = self.generated
+        while len(generated) <= index:
+            generated.append(next(self.sequence))
+        return generated[index]
+
+    def next_shape(self):
+        shape = self.shape_at(self.position)
+        self.position += 1
+        if self.lookahead:
+            self.queue.popleft()
+            self.queue.append(self.shape_at(self.position + self.lookahead - 1))
+        return shape
+
+    def snapshot(self):
+        return self.position
+
+    def restore(self, position):
+        """Goes back (or forward) to a snapshot, the queue is updated in place"""
+        self.position = position
+        self.queue.clear()
+        self.queue.extend(self.shape_at(position + i) for i in range(self.lookahead))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next_shape()
+
+
+def bag_permutations(rng, count):
+    """count shuffled bags as a (count, 7) uint8 array of shape indices"""
+    import numpy as np
+    return rng.permuted(np.tile(np.arange(len(SHAPES), dtype=np.uint8), (count, 1)), axis=1)
+
+
+def bulk(count, seed = None, policy = "bag"):
+    """
+    count shapes as a numpy uint8 array of indices into SHAPES, generated in one go.
+    Takes the same seeds as Randomizer
+    """
+    import numpy as np
+    if seed is not None:
+        seed %= SEED_RANGE
+    if policy == "bag":
+        rng = np.random.default_rng(seed)
+        return bag_permutations(rng, -(-count // len(SHAPES))).ravel()[:count]
+    if policy == "random":
+        rng = np.random.default_rng(seed)
+        return rng.integers(0, len(SHAPES), count, dtype=np.uint8)
+    # no vectorized form, every shape depends on the ones before it
+    index = {shape: i for i, shape in enumerate(SHAPES)}
+    sequence = POLICIES[policy](Random(seed))
+    return np.fromiter((index[shape] for shape in islice(sequence, count)), dtype=np.uint8, count=count)
@@ -0,0 +1,61 @@
+# Software renderer for the playfield. The cells in view are a small array of color indices,
+# numpy scales it up to pixels by indexing into the tile pixels and the result is written
+# straight into the surface with the grid lines on top, all in one pass. A frame costs the
+# same however many cells are filled, which is what big or crowded boards and recording
+# lots of games headless need. Game uses it with renderer="array".
+
+import numpy as np
+import pygame
+from numpy.lib.stride_tricks import as_strided
+
+from constants import LINE_COLOR
+
+
+class FieldRaster:
+    def __init__(self, surface, tiles, cell_size, grid = True):
+        """
+        draws into surface (8, 16 or 32 bit), sized to a whole number of cells.
+        The pixels of tiles are copied once, so the field looks exactly like blitting them
+        """
+        self.surface = surface
+        self.cell_size = cell_size
+        self.columns = surface.get_width() // cell_size
+        self.rows = surface.get_height() // cell_size
+        self.grid = grid
+        self.line = surface.map_rgb(LINE_COLOR)
+
+        strip = pygame.Surface((len(tiles) * cell_size, cell_size), 0, surface)
+        self.index = {}  # tile -> its pattern
+        for i, tile in enumerate(tiles):
+            strip.blit(tile, (i * cell_size, 0))
+            self.index.setdefault(tile, i)
+        # [tile, y, x] -> mapped pixel, rows of pixels like in the surface's memory
+        patterns = pygame.surfarray.array2d(strip).reshape(len(tiles), cell_size, cell_size)
+        self.patterns = np.ascontiguousarray(patterns.transpose(0, 2, 1))
+
+    def draw(self, board, left, top, pieces):
+        """
+        Draws the cells of board from column left and row top on, with pieces
+        ((x, y) in board coordinates -> tile) on top of them
+        """
+        columns, rows, cell = self.columns, self.rows, self.cell_size
+        cells = np.frombuffer(b''.join(board.cells[top:top + rows]), np.uint8).reshape(rows, board.columns)
+        # the board's color indices are the indices of their tiles
+        frame = cells[:, left:left + columns].copy()
+        for (x, y), tile in pieces.items():
+            frame[y - top, x - left] = self.index[tile]
+
+        target = pygame.surfarray.pixels2d(self.surface)
+        try:
+            # the pixels seen as [row, y in cell, column, x in cell], so every cell
+            # is written straight from its pattern without an intermediate image
+            pitch, pixel = target.strides[1], target.strides[0]
+            view = as_strided(target, (rows, cell, columns, cell), (pitch * cell, pitch, pixel * cell, pixel))
+            view.transpose(0, 2, 1, 3)[...] = self.patterns[frame]
+            del view
+            if self.grid:
+                target[cell:columns * cell:cell, :rows * cell] = self.line
+                target[:columns * cell, cell:rows * cell:cell] = self.line
+        finally:
+            # the surface stays locked as long as the array exists
+            del target
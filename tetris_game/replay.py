@@ -0,0 +1,182 @@
+# Compact binary recordings of a game and a headless player that re-simulates them.
+#
+# File layout (little endian):
+#   header:  b'TRPL', version (u8), seed (u64), simulation step, das and arr in ms, columns, rows (u16 each)
+#   pieces:  count (u32), one byte per piece (index into SHAPES)
+#   inputs:  count (u32), per event: steps since the previous event (varint), control << 1 | pressed (u8)
+#   result:  end time in steps (varint), score (u64), lines (u32), level (u32), pieces (u32)
+#
+# usage: python tetris_game/replay.py recordings/*.trp
+
+import struct
+import sys
+from time import perf_counter
+
+from constants import SIMULATION_STEP, DAS, ARR, COLUMNS, ROWS
+from engine import SHAPES
+from simulation import Simulation, CONTROLS
+
+MAGIC = b'TRPL'
+VERSION = 3
+HEADER = struct.Struct('<4sBQHHHHH')
+COUNT = struct.Struct('<I')
+RESULT = struct.Struct('<QIII')
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Recording:
+    def __init__(self, seed = 0, step = SIMULATION_STEP, das = DAS, arr = ARR, columns = COLUMNS, rows = ROWS):
+        """
+        a recorded game: the seed, the input settings, the board size, every piece in the order
+        the engine got them, every press and release with its simulation time and the final result
+        """
+        self.seed = seed
+        self.step = step
+        self.das = das
+        self.arr = arr
+        self.columns = columns
+        self.rows = rows
+        self.pieces = []
+        self.inputs = []  # (time, control, pressed)
+        self.end_time = 0
+        self.score = 0
+        self.lines = 0
+        self.level = 1
+        self.pieces_placed = 0
+
+    def record_shapes(self, get_next_shape):
+        """Wraps get_next_shape so every piece handed to the engine is recorded"""
+        def recorded():
+            shape = get_next_shape()
+            self.pieces.append(shape)
+            return shape
+        return recorded
+
+    def record_input(self, time, control, pressed):
+        self.inputs.append((time, control, pressed))
+
+    def finish(self, simulation):
+        engine = simulation.engine
+        self.das = simulation.das
+        self.arr = simulation.arr
+        self.columns = engine.board.columns
+        self.rows = engine.board.height
+        self.end_time = simulation.time
+        self.score = engine.current_score
+        self.lines = engine.current_lines
+        self.level = engine.current_level
+        self.pieces_placed = engine.pieces
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, self.step, self.das, self.arr, self.columns, self.rows))
+
+        out += COUNT.pack(len(self.pieces))
+        out += bytes(SHAPES.index(shape) for shape in self.pieces)
+
+        out += COUNT.pack(len(self.inputs))
+        last_step = 0
+        for time, control, pressed in self.inputs:
+            time_step = int(time // self.step)
+            write_varint(out, time_step - last_step)
+            out.append(CONTROLS.index(control) << 1 | pressed)
+            last_step = time_step
+
+        write_varint(out, int(self.end_time // self.step))
+        out += RESULT.pack(self.score, self.lines, self.level, self.pieces_placed)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, step, das, arr, columns, rows = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a tetris recording (or an unsupported version)")
+        recording = cls(seed, step, das, arr, columns, rows)
+        pos = HEADER.size
+
+        (count,) = COUNT.unpack_from(data, pos)
+        pos += COUNT.size
+        recording.pieces = [SHAPES[i] for i in data[pos:pos + count]]
+        pos += count
+
+        (count,) = COUNT.unpack_from(data, pos)
+        pos += COUNT.size
+        time_step = 0
+        for _ in range(count):
+            delta, pos = read_varint(data, pos)
+            time_step += delta
+            code = data[pos]
+            pos += 1
+            recording.inputs.append((time_step * step, CONTROLS[code >> 1], bool(code & 1)))
+
+        end_step, pos = read_varint(data, pos)
+        recording.end_time = end_step * step
+        recording.score, recording.lines, recording.level, recording.pieces_placed = RESULT.unpack_from(data, pos)
+        return recording
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+def play(recording):
+    """Re-simulates a recording headless as fast as possible, returns the finished Simulation"""
+    if recording.step != SIMULATION_STEP:
+        raise ValueError(f"recorded with a {recording.step} ms step, this build uses {SIMULATION_STEP} ms")
+
+    pieces = iter(recording.pieces)
+    simulation = Simulation(lambda: next(pieces), das = recording.das, arr = recording.arr,
+                            columns = recording.columns, rows = recording.rows)
+
+    held = set()
+    for time, control, pressed in recording.inputs:
+        simulation.run_until(time)
+        # one at a time like they were recorded, a tap can press and release at the same time
+        if pressed:
+            held.add(control)
+        else:
+            held.discard(control)
+        simulation.set_held(held)
+
+    simulation.run_until(recording.end_time)
+    return simulation
+
+
+def verify(recording):
+    """Plays a recording and checks the final score, lines and level against the recorded ones"""
+    engine = play(recording).engine
+    return (engine.current_score, engine.current_lines, engine.current_level) == \
+        (recording.score, recording.lines, recording.level)
+
+
+if __name__ == "__main__":
+    failed = 0
+    start = perf_counter()
+    for path in sys.argv[1:]:
+        recording = Recording.load(path)
+        ok = verify(recording)
+        failed += not ok
+        print(f"{'ok    ' if ok else 'FAILED'} {path}: score {recording.score}, lines {recording.lines}, level {recording.level}")
+    print(f"verified {len(sys.argv) - 1} recordings in {perf_counter() - start:.2f}s, {failed} failed")
+    sys.exit(1 if failed else 0)
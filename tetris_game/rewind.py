@@ -0,0 +1,25 @@
+# Rewind for practice mode: a snapshot at the spawn of each of the last pieces.
+# Snapshots share the board rows that did not change, so keeping a long history is cheap.
+
+from collections import deque, namedtuple
+
+GameState = namedtuple("GameState", "simulation randomizer")
+
+
+class History:
+    def __init__(self, size = 100):
+        """the newest state is the one of the piece that is falling right now"""
+        self.states = deque(maxlen=size)
+
+    def push(self, state):
+        self.states.append(state)
+
+    def undo(self):
+        """Drops the newest state and returns the one before it, None if there is nothing to go back to"""
+        if len(self.states) < 2:
+            return None
+        self.states.pop()
+        return self.states[-1]
+
+    def __len__(self):
+        return len(self.states)
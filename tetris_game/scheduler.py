@@ -0,0 +1,104 @@
+# Heap based event scheduler with an injectable clock.
+# Events fire in time order at their exact scheduled time, so a late frame
+# fires every event it missed instead of dropping them, and with a ManualClock
+# the same logic can run as fast as the CPU allows.
+
+import heapq
+from itertools import count
+from time import perf_counter
+
+
+def real_clock():
+    """Milliseconds from a monotonic clock"""
+    return perf_counter() * 1000
+
+
+class ManualClock:
+    def __init__(self, start = 0):
+        """a clock that only moves when told to, for headless and fixed step simulation"""
+        self.time = start
+
+    def __call__(self):
+        return self.time
+
+    def advance(self, ms):
+        self.time += ms
+
+
+class Event:
+    __slots__ = ('time', 'func', 'cancelled')
+
+    def __init__(self, time, func):
+        self.time = time
+        self.func = func
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    def __init__(self, clock = real_clock):
+        """
+        keeps pending events in a heap ordered by time.
+        self.time is the scheduler's current time: the clock time of the last
+        run_until call, or the event's own time while an event is firing, so
+        anything scheduled from inside an event is relative to when it should have fired
+        """
+        self.clock = clock
+        self.time = clock()
+        self.queue = []
+        self.counter = count()  # keeps events with the same time in scheduling order
+
+    def schedule(self, delay, func):
+        return self.schedule_at(self.time + delay, func)
+
+    def schedule_at(self, time, func):
+        event = Event(time, func)
+        heapq.heappush(self.queue, (time, next(self.counter), event))
+        return event
+
+    def next_time(self):
+        """Time of the next pending event, None if there is nothing scheduled"""
+        queue = self.queue
+        while queue and queue[0][2].cancelled:
+            heapq.heappop(queue)
+        return queue[0][0] if queue else None
+
+    def run_until(self, time = None):
+        """Fires every event due at or before time (the clock's current time by default)"""
+        if time is None:
+            time = self.clock()
+        queue = self.queue
+        while queue and queue[0][0] <= time:
+            event_time, _, event = heapq.heappop(queue)
+            if event.cancelled:
+                continue
+            self.time = event_time
+            event.func()
+        self.time = max(self.time, time)
+
+
+class FixedTimestep:
+    def __init__(self, step, clock = real_clock):
+        """
+        turns real elapsed time into a whole number of fixed simulation steps,
+        keeping the remainder for the next frame so no time is ever lost
+        """
+        self.step = step
+        self.clock = clock
+        self.last_time = clock()
+        self.accumulator = 0
+
+    def steps(self):
+        """Number of fixed steps that are due since the last call"""
+        now = self.clock()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        steps = int(self.accumulator // self.step)
+        self.accumulator -= steps * self.step
+        return steps
+
+    def pending(self):
+        """Real time that has passed but is not covered by a step yet"""
+        return self.accumulator + self.clock() - self.last_time
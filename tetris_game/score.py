@@ -1,35 +1,57 @@
+import pygame
 from constants import *
-from os.path import join
+import assets
 
 class Score:
-    def __init__(self):
+    def __init__(self, finesse = False):
+        """score, level and lines, with finesse also the finesse faults (see finesse.py)"""
         self.surface = pygame.Surface((SIDE_BAR_WIDTH, BORDER_HEIGHT * SCORE_HEIGHT - PADDING))
         self.display_surface = pygame.display.get_surface()
         self.rect = self.surface.get_rect(bottomright = (WINDOW_WIDTH - PADDING, WINDOW_HEIGHT - PADDING))
 
-        # font
-        self.font = pygame.font.Font(join('graphics','font.ttf'), 30)
+        # font, loaded on the first draw
+        self.text_cache = None
 
         # increment
-        self.increment_height = self.surface.get_height() / 3
+        self.show_finesse = finesse
+        self.increment_height = self.surface.get_height() / (4 if finesse else 3)
 
         # data 
         self.score = 0
         self.level = 1
         self.lines = 0
+        self.finesse = 0
+
+        # values currently on screen, only redraw when they change
+        self.drawn = None
 
     def display_text(self, pos, text):
-        text_surface = self.font.render(f'{text[0]}: {text[1]}', True, 'white')
+        if self.text_cache is None:
+            self.text_cache = assets.TextCache(assets.font(30))
+        text_surface = self.text_cache.render(*text)
         text_rext = text_surface.get_rect(center = pos)
         self.surface.blit(text_surface, text_rext)
 
-    def run(self):
+    def invalidate(self):
+        """Forces a full redraw on the next frame"""
+        self.drawn = None
 
+    def run(self):
+        """Draws the score panel if a value changed, returns the changed screen rects"""
+        values = (self.score, self.level, self.lines, self.finesse)
+        if values == self.drawn:
+            return []
+        self.drawn = values
+
+        texts = [('Score',self.score), ('Level', self.level), ('Lines', self.lines)]
+        if self.show_finesse:
+            texts.append(('Faults', self.finesse))
         self.surface.fill(BLACK)
-        for i, text in enumerate([('Score',self.score), ('Level', self.level), ('Lines', self.lines)]):
+        for i, text in enumerate(texts):
             x = self.surface.get_width() / 2
             y = self.increment_height / 2 + i * self.increment_height
             self.display_text((x,y), text)
 
         self.display_surface.blit(self.surface,self.rect)
-        pygame.draw.rect(self.display_surface, LINE_COLOR, self.rect, 2, 2)
\ No newline at end of file
+        pygame.draw.rect(self.display_surface, LINE_COLOR, self.rect, 2, 2)
+        return [self.rect]
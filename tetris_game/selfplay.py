@@ -0,0 +1,120 @@
+# Runs many headless games across a process pool and summarizes the results.
+#
+# usage: python tetris_game/selfplay.py --games 200 --agent bot --lookahead 1 --workers 8
+
+import json
+import statistics
+from argparse import ArgumentParser
+from multiprocessing import Pool, cpu_count
+from random import Random
+from time import perf_counter
+
+from engine import Engine
+from bot import Bot, enumerate_placements
+from randomizer import Randomizer, POLICIES
+
+RESULT_FIELDS = ("score", "lines", "level", "pieces", "duration")
+
+
+class RandomAgent:
+    def __init__(self, random):
+        """drops every piece in a random reachable placement"""
+        self.random = random
+
+    def play(self, engine, next_shapes = ()):
+        placements = enumerate_placements(engine.board, engine.tetromino)
+        if not placements:
+            while engine.move_down():
+                pass
+            return
+        # going straight to the final position is the same as walking the path
+        placement = self.random.choice(placements)
+        engine.tetromino.x, engine.tetromino.y = placement.x, placement.y
+        engine.tetromino.rotation_state, engine.tetromino.blocks = placement.rotation_state, placement.blocks
+        engine.move_down()
+
+
+def make_agent(name, lookahead, random):
+    if name == "bot":
+        return Bot(lookahead)
+    if name == "random":
+        return RandomAgent(random)
+    raise ValueError(f"unknown agent {name}")
+
+
+def play_game(job):
+    """Plays one game headless, runs in a worker process"""
+    index, seed, agent_name, lookahead, max_pieces, policy = job
+    randomizer = Randomizer(seed, policy)
+
+    start = perf_counter()
+    engine = Engine(randomizer.next_shape)
+    agent = make_agent(agent_name, lookahead, Random(seed))
+    while not engine.game_over and engine.pieces < max_pieces:
+        agent.play(engine, randomizer.queue)
+
+    return {
+        "game": index,
+        "seed": seed,
+        "score": engine.current_score,
+        "lines": engine.current_lines,
+        "level": engine.current_level,
+        "pieces": engine.pieces,
+        "topped_out": engine.game_over,
+        "duration": perf_counter() - start,
+    }
+
+
+def summarize(results):
+    summary = {}
+    for field in RESULT_FIELDS:
+        values = [result[field] for result in results]
+        summary[field] = {
+            "mean": statistics.fmean(values),
+            "median": statistics.median(values),
+            "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+            "min": min(values),
+            "max": max(values),
+        }
+    return summary
+
+
+def main():
+    parser = ArgumentParser(description="Run headless games across all cores and summarize the results")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=cpu_count())
+    parser.add_argument("--seed", type=int, default=0, help="game i is played with seed + i")
+    parser.add_argument("--agent", choices=("bot", "random"), default="bot")
+    parser.add_argument("--lookahead", type=int, default=0, help="preview pieces the bot looks at")
+    parser.add_argument("--randomizer", choices=POLICIES, default="bag", help="how the piece sequence is generated")
+    parser.add_argument("--max-pieces", type=int, default=1000, help="stop a game after this many pieces")
+    parser.add_argument("--json", metavar="PATH", help="write every result and the summary to a json file")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    jobs = [(i, args.seed + i, args.agent, args.lookahead, args.max_pieces, args.randomizer) for i in range(args.games)]
+    results = []
+    start = perf_counter()
+    with Pool(args.workers) as pool:
+        # results stream back as soon as each game finishes
+        for result in pool.imap_unordered(play_game, jobs):
+            results.append(result)
+            if not args.quiet:
+                print(f"game {result['game']:>4}: score {result['score']:>7}, lines {result['lines']:>4}, "
+                      f"level {result['level']:>3}, pieces {result['pieces']:>5}, {result['duration']:.2f}s")
+    elapsed = perf_counter() - start
+
+    results.sort(key=lambda result: result["game"])
+    summary = summarize(results)
+    print(f"\n{len(results)} games in {elapsed:.2f}s with {args.workers} workers ({args.agent}, lookahead {args.lookahead}, {args.randomizer} randomizer)")
+    for field, stats in summary.items():
+        print(f"{field:>9}: mean {stats['mean']:10.2f}  median {stats['median']:10.2f}  "
+              f"stdev {stats['stdev']:10.2f}  min {stats['min']:10.2f}  max {stats['max']:10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({"args": vars(args), "summary": summary, "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
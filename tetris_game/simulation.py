@@ -0,0 +1,172 @@
+# The game logic over time: engine, gravity and input timers on a scheduler.
+# Has no pygame dependency, the same Simulation runs in the window (driven by
+# real time in fixed steps) or headless as fast as the CPU allows.
+
+from collections import namedtuple
+
+from constants import UPDATE_START_SPEED, DAS, ARR, SIMULATION_STEP, COLUMNS, ROWS
+from engine import Engine
+from scheduler import Scheduler, ManualClock
+from timer import Timer
+
+# Controls, they act when pressed and released
+LEFT = 'left'
+RIGHT = 'right'
+ROTATE = 'rotate'
+ROTATE_COUNTER = 'rotate counter'
+DOWN = 'down'
+HARD_DROP = 'hard drop'
+CONTROLS = (LEFT, RIGHT, ROTATE, ROTATE_COUNTER, DOWN, HARD_DROP)
+
+# see Simulation.snapshot
+SimulationState = namedtuple("SimulationState", "engine timers held shift_direction")
+
+
+class Simulation:
+    def __init__(self, get_next_shape, update_score = None, clock = None, recorder = None, das = DAS, arr = ARR, columns = COLUMNS, rows = ROWS, telemetry = None, finesse = None):
+        """
+        runs the game on its own clock, which only moves in fixed steps.
+        by default that is a ManualClock starting at 0, so nothing here depends on real time.
+        controls act on press and release (set_held), auto shift and auto repeat are
+        scheduled events, so the game only depends on when controls were pressed and
+        released, which is what a recorder stores.
+        das: delayed auto shift, ms a direction has to be held before it starts repeating
+        arr: auto repeat rate, ms between repeated moves (0 moves straight to the wall)
+        columns, rows: size of the board
+        telemetry gets the inputs and every locked piece (see telemetry.py),
+        finesse (a finesse.FinesseCheck) as well, to judge every piece when it locks
+        """
+        self.clock = clock if clock else ManualClock()
+        self.scheduler = Scheduler(self.clock)
+        self.recorder = recorder
+        if recorder:
+            get_next_shape = recorder.record_shapes(get_next_shape)
+        self.telemetry = telemetry
+        self.finesse = finesse
+        self.engine = Engine(get_next_shape, update_score, columns, rows,
+                             piece_locked = self.piece_locked if telemetry or finesse else None)
+        self.held = frozenset()
+
+        self.down_speed = UPDATE_START_SPEED
+        self.down_speed_increment = self.down_speed * 0.3
+
+        self.das = das
+        self.arr = arr
+        self.shift_direction = 0
+
+        self.timers = {
+            "vertical move": Timer(UPDATE_START_SPEED, True, self.move_down, self.scheduler),
+            "auto shift": Timer(das, False, self.auto_shift, self.scheduler),
+            "auto repeat": Timer(arr if arr else SIMULATION_STEP, True, self.auto_repeat, self.scheduler),
+        }
+        self.timers["vertical move"].activate()
+
+    @property
+    def time(self):
+        return self.scheduler.time
+
+    def snapshot(self):
+        """
+        Everything needed to continue from this point: the engine, the timers with the time
+        they had left and the held controls
+        """
+        return SimulationState(
+            self.engine.snapshot(),
+            {name: timer.snapshot() for name, timer in self.timers.items()},
+            self.held, self.shift_direction)
+
+    def restore(self, state):
+        """Continues from a snapshot, timers keep the time they had left but the clock keeps running"""
+        self.engine.restore(state.engine)
+        for name, timer_state in state.timers.items():
+            self.timers[name].restore(timer_state)
+        self.held = state.held
+        self.shift_direction = state.shift_direction
+
+    def move_down(self):
+        self.engine.move_down()
+
+    def piece_locked(self, tetromino, lines):
+        extra_inputs = self.finesse.piece_locked(tetromino) if self.finesse else None
+        if self.telemetry:
+            self.telemetry.piece_locked(self.time, self.engine, tetromino.shape, lines, extra_inputs)
+
+    def step(self, ms = SIMULATION_STEP):
+        """Advances the clock by ms (one fixed step by default) and fires everything that became due"""
+        self.clock.advance(ms)
+        self.scheduler.run_until(self.clock())
+
+    def run_until(self, time):
+        """Fast forward to the given time, events still fire at their exact times"""
+        if time > self.time:
+            self.step(time - self.time)
+
+    def set_held(self, held):
+        """Sets the controls that are held down from now on, acting on what was pressed and released"""
+        held = frozenset(held)
+        if held == self.held:
+            return
+        released = sorted(self.held - held, key=CONTROLS.index)
+        pressed = sorted(held - self.held, key=CONTROLS.index)
+        if self.recorder:
+            for control in released + pressed:
+                self.recorder.record_input(self.time, control, control in held)
+        if self.telemetry and pressed:
+            self.telemetry.pressed(len(pressed))
+        if self.finesse and pressed:
+            self.finesse.pressed(pressed)
+        self.held = held
+
+        for control in released:
+            self.release(control)
+        for control in pressed:
+            self.press(control)
+
+    def press(self, control):
+        if control == LEFT:
+            self.start_shift(-1)
+        elif control == RIGHT:
+            self.start_shift(1)
+        elif control == ROTATE:
+            self.engine.rotate()
+        elif control == ROTATE_COUNTER:
+            self.engine.rotate_counter()
+        elif control == DOWN:
+            self.timers["vertical move"].duration = self.down_speed_increment
+        elif control == HARD_DROP:
+            # the next piece gets a full gravity period
+            self.engine.hard_drop()
+            self.timers["vertical move"].activate()
+
+    def release(self, control):
+        if control in (LEFT, RIGHT) and self.shift_direction == (-1 if control == LEFT else 1):
+            self.stop_shift()
+            # the other direction is still held, it takes over
+            other = RIGHT if control == LEFT else LEFT
+            if other in self.held:
+                self.start_shift(1 if other == RIGHT else -1)
+        elif control == DOWN:
+            self.timers["vertical move"].duration = self.down_speed
+
+    def start_shift(self, direction):
+        """Moves once right away, auto shift kicks in once the direction is held for das ms"""
+        self.shift_direction = direction
+        self.engine.move_horizontal(direction)
+        self.timers["auto repeat"].deactivate()
+        self.timers["auto shift"].activate()
+
+    def stop_shift(self):
+        self.shift_direction = 0
+        self.timers["auto shift"].deactivate()
+        self.timers["auto repeat"].deactivate()
+
+    def auto_shift(self):
+        self.auto_repeat()
+        self.timers["auto repeat"].activate()
+
+    def auto_repeat(self):
+        if self.arr:
+            self.engine.move_horizontal(self.shift_direction)
+        else:
+            while self.engine.move_horizontal(self.shift_direction):
+                pass
@@ -0,0 +1,106 @@
+# Super Rotation System (SRS) lookup tables, built once at import time.
+# Every piece is stored as block offsets relative to its pivot (the first block in TETROMINOS),
+# so rotating a piece is a table lookup followed by a collision test per wall kick.
+#
+#   ORIENTATIONS[shape][rotation_state]          -> block offsets
+#   KICKS[shape][(from_state, to_state)]         -> wall kick offsets to try, in order
+#   ROTATIONS[shape][rotation_state][direction]  -> (new_rotation_state, new block offsets, kicks)
+#       direction 0 is clockwise, 1 is counterclockwise
+#   BOTTOMS[shape][rotation_state]               -> (x offset, lowest y offset) per column the piece covers
+
+from constants import TETROMINOS
+
+CLOCKWISE = 0
+COUNTER_CLOCKWISE = 1
+
+# Standard wall kick data for J, L, S, T, Z pieces
+WALL_KICK_DATA = {
+    (0, 1): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],  # 0->R
+    (1, 2): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],      # R->2
+    (2, 3): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],     # 2->L
+    (3, 0): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],   # L->0
+    (1, 0): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],     # R->0
+    (2, 1): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],   # 2->R
+    (3, 2): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],  # L->2
+    (0, 3): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)]       # 0->L
+}
+
+# Special wall kick data for I piece
+I_WALL_KICK_DATA = {
+    (0, 1): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],    # 0->R
+    (1, 2): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)],    # R->2
+    (2, 3): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],    # 2->L
+    (3, 0): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],    # L->0
+    (1, 0): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],    # R->0
+    (2, 1): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],    # 2->R
+    (3, 2): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],    # L->2
+    (0, 3): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)]     # 0->L
+}
+
+
+def get_wall_kick_data(shape, from_state, to_state):
+    """Get wall kick offsets for SRS system"""
+    if shape == "I":
+        return I_WALL_KICK_DATA.get((from_state, to_state), [(0, 0)])
+    return WALL_KICK_DATA.get((from_state, to_state), [(0, 0)])
+
+
+def rotate_clockwise(blocks):
+    # Rotation matrix for 90° clockwise: (x, y) -> (-y, x)
+    return tuple((-dy, dx) for dx, dy in blocks)
+
+
+def build_orientations(shape):
+    """All 4 orientations of a piece, relative to its pivot"""
+    pivot_x, pivot_y = TETROMINOS[shape]['shape'][0]
+    blocks = tuple((x - pivot_x, y - pivot_y) for x, y in TETROMINOS[shape]['shape'])
+    orientations = []
+    for _ in range(4):
+        orientations.append(blocks)
+        if shape != "O":  # O piece doesn't rotate
+            blocks = rotate_clockwise(blocks)
+    return tuple(orientations)
+
+
+def build_bottoms(shape):
+    bottoms = []
+    for blocks in ORIENTATIONS[shape]:
+        lowest = {}
+        for dx, dy in blocks:
+            lowest[dx] = max(dy, lowest.get(dx, dy))
+        bottoms.append(tuple(sorted(lowest.items())))
+    return tuple(bottoms)
+
+
+def build_kicks(shape):
+    if shape == "O":
+        return {}
+    kicks = {}
+    for from_state in range(4):
+        for to_state in ((from_state + 1) % 4, (from_state - 1) % 4):
+            kicks[(from_state, to_state)] = tuple(get_wall_kick_data(shape, from_state, to_state))
+    return kicks
+
+
+def build_rotations(shape):
+    rotations = []
+    for rotation_state in range(4):
+        transitions = []
+        for step in (1, -1):
+            if shape == "O":
+                # no kicks to try, so the rotation always fails
+                transitions.append((rotation_state, ORIENTATIONS[shape][rotation_state], ()))
+                continue
+            new_rotation_state = (rotation_state + step) % 4
+            transitions.append((
+                new_rotation_state,
+                ORIENTATIONS[shape][new_rotation_state],
+                KICKS[shape][(rotation_state, new_rotation_state)]))
+        rotations.append(tuple(transitions))
+    return tuple(rotations)
+
+
+ORIENTATIONS = {shape: build_orientations(shape) for shape in TETROMINOS}
+KICKS = {shape: build_kicks(shape) for shape in TETROMINOS}
+ROTATIONS = {shape: build_rotations(shape) for shape in TETROMINOS}
+BOTTOMS = {shape: build_bottoms(shape) for shape in TETROMINOS}
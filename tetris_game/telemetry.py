@@ -0,0 +1,154 @@
+# Gameplay telemetry: what happens per piece and per session, for tuning the speed,
+# the level curve and SCORE_DATA with real games. Has no pygame dependency.
+#
+# The game thread only puts tuples into a ring buffer that is allocated up front, a
+# background thread turns them into JSON lines and writes them in batches, so the game
+# loop never waits on the disk. If the writer can't keep up, events are dropped (and
+# counted) instead of blocking. Files rotate like logging's RotatingFileHandler:
+# telemetry.jsonl, telemetry.jsonl.1, ... Every line is one event:
+#   {"event": "piece", "session": "...", "time": 81230, "number": 57, "shape": "T", ...}
+# time is game time in ms, the fields of every event are listed in EVENTS.
+
+import json
+import os
+from os.path import join
+from threading import Event, Thread
+from time import time as wall_time
+from uuid import uuid4
+
+from constants import MAX_FPS
+
+EVENTS = {
+    "session": ("seed", "policy", "das", "arr", "columns", "rows", "started"),
+    # piece_ms: from spawn to lock, inputs: controls pressed while it was falling,
+    # finesse: inputs over the fewest possible (null if not judged, see finesse.py)
+    "piece": ("number", "shape", "piece_ms", "inputs", "lines", "pps", "finesse"),
+    "clear": ("lines", "total_lines", "score", "level"),
+    "level": ("level", "total_lines", "level_ms"),
+    "slow frame": ("frame_ms",),
+    "session end": ("pieces", "pps", "lines", "score", "level", "dropped"),
+}
+SLOW_FRAME = 2 * 1000 / MAX_FPS  # ms of work in one frame before it is reported
+
+
+class Telemetry:
+    def __init__(self, directory = "telemetry", capacity = 4096, flush_interval = 1.0, max_bytes = 1 << 20, backups = 5):
+        """
+        collects the events of one session and writes them to directory on a background thread.
+        capacity is how many events can wait for the writer, it wakes up every
+        flush_interval seconds or when the buffer is half full
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = join(directory, "telemetry.jsonl")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.session = uuid4().hex
+
+        self.slots = [None] * capacity
+        self.capacity = capacity
+        self.head = 0  # events put in, only the game thread moves it
+        self.tail = 0  # events written, only the writer moves it
+        self.dropped = 0
+
+        # what the events are computed from
+        self.inputs = 0
+        self.spawn_time = 0
+        self.level = 1
+        self.level_time = 0
+
+        self.file = open(self.path, 'a')
+        self.closed = False
+        self.wake = Event()
+        self.writer = Thread(target = self.run, name = "telemetry writer", daemon = True)
+        self.writer.start()
+
+    def emit(self, kind, time, *values):
+        """Queues an event, never blocks: drops it if the writer is too far behind"""
+        pending = self.head - self.tail
+        if pending >= self.capacity:
+            self.dropped += 1
+            return
+        self.slots[self.head % self.capacity] = (kind, time, values)
+        self.head += 1
+        if pending + 1 == self.capacity // 2:
+            self.wake.set()
+
+    # ---------- game hooks ----------
+
+    def session_start(self, seed, policy, das, arr, columns, rows):
+        self.emit("session", 0, seed, policy, das, arr, columns, rows, wall_time())
+
+    def pressed(self, count = 1):
+        self.inputs += count
+
+    def piece_locked(self, time, engine, shape, lines, finesse = None):
+        """Called by the simulation when a piece locked, engine already has the score and level after it"""
+        pps = round(engine.pieces * 1000 / time, 3) if time else 0
+        self.emit("piece", time, engine.pieces, shape, time - self.spawn_time, self.inputs, lines, pps, finesse)
+        self.spawn_time = time
+        self.inputs = 0
+        if lines:
+            self.emit("clear", time, lines, engine.current_lines, engine.current_score, engine.current_level)
+        if engine.current_level != self.level:
+            self.emit("level", time, engine.current_level, engine.current_lines, time - self.level_time)
+            self.level = engine.current_level
+            self.level_time = time
+
+    def frame(self, time, ms):
+        """ms of work the frame took, only the slow ones are kept"""
+        if ms > SLOW_FRAME:
+            self.emit("slow frame", time, round(ms, 2))
+
+    def session_end(self, time, engine):
+        pps = round(engine.pieces * 1000 / time, 3) if time else 0
+        self.emit("session end", time, engine.pieces, pps, engine.current_lines,
+                  engine.current_score, engine.current_level, self.dropped)
+
+    # ---------- writer thread ----------
+
+    def run(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.write_pending()
+        self.write_pending()
+
+    def write_pending(self):
+        head = self.head
+        if head == self.tail:
+            return
+        lines = []
+        for i in range(self.tail, head):
+            kind, time, values = self.slots[i % self.capacity]
+            record = {"event": kind, "session": self.session, "time": time}
+            record.update(zip(EVENTS[kind], values))
+            lines.append(json.dumps(record))
+        # the slots can be reused from here on
+        self.tail = head
+
+        data = "\n".join(lines) + "\n"
+        if self.file.tell() and self.file.tell() + len(data) > self.max_bytes:
+            self.rotate()
+        self.file.write(data)
+        self.file.flush()
+
+    def rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'a')
+
+    def close(self):
+        """Writes everything still queued and stops the writer"""
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        self.writer.join()
+        self.file.close()
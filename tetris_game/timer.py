@@ -1,32 +1,68 @@
-from pygame.time import get_ticks
-
-class Timer: 
-    def __init__(self, duration, repeated = False, func = None):
+class Timer:
+    def __init__(self, duration, repeated = False, func = None, scheduler = None):
+        """
+        a countdown driven by a Scheduler: activating it schedules an event
+        instead of checking the time on every frame
+        """
         self.repeated = repeated
-        self.duration = duration
+        self._duration = duration
         self.func = func
+        self.scheduler = scheduler
 
         self.start_time = 0
-        self.active = False
+        self.event = None
+
+    @property
+    def active(self):
+        return self.event is not None
+
+    @property
+    def duration(self):
+        return self._duration
+
+    @duration.setter
+    def duration(self, duration):
+        """
+        Changing the duration of a running timer applies to the current countdown,
+        measured from when it was started
+        """
+        self._duration = duration
+        if self.event:
+            self.event.cancel()
+            self.event = self.scheduler.schedule_at(max(self.start_time + duration, self.scheduler.time), self.fire)
 
     def activate(self):
         """
         Activates the timer, starting the countdown.
         """
-        self.start_time = get_ticks()
-        self.active = True
+        if self.event:
+            self.event.cancel()
+        self.start_time = self.scheduler.time
+        self.event = self.scheduler.schedule(self._duration, self.fire)
 
     def deactivate(self):
-        self.active = False
+        if self.event:
+            self.event.cancel()
+        self.event = None
         self.start_time = 0
-    
-    def update(self):
-        current_time = get_ticks()
-        if current_time - self.start_time >= self.duration and self.active:
-            if self.func and self.start_time != 0:
-                self.func()
-            self.deactivate()
-            if self.repeated:
-                self.activate()
-
-        
\ No newline at end of file
+
+    def snapshot(self):
+        """(duration, ms left until it fires or None if it is not active)"""
+        if not self.event:
+            return (self._duration, None)
+        return (self._duration, self.event.time - self.scheduler.time)
+
+    def restore(self, state):
+        """Picks up a snapshot at the current time, with the same time left as when it was taken"""
+        self.deactivate()
+        self._duration, remaining = state
+        if remaining is not None:
+            self.start_time = self.scheduler.time + remaining - self._duration
+            self.event = self.scheduler.schedule(remaining, self.fire)
+
+    def fire(self):
+        self.event = None
+        if self.func:
+            self.func()
+        if self.repeated and not self.event:
+            self.activate()
@@ -0,0 +1,172 @@
+# Two player versus client: your own game on the left, the opponent's board on the right.
+# Both players get the same piece sequence, clearing 2, 3 or 4 lines sends garbage over.
+# See network.py for the server and the protocol.
+#
+# usage: python tetris_game/versus.py --serve               (host the match on this machine)
+#        python tetris_game/versus.py --connect 192.168.0.12  (join it from another one)
+
+from random import Random
+from threading import Thread
+
+import pygame
+from constants import *
+from engine import SHAPES, COLOR_INDEX
+from srs import ORIENTATIONS
+from main import Main
+import assets
+import network
+
+NETWORK = pygame.event.custom_type()
+
+
+class Opponent:
+    def __init__(self, topleft):
+        """the opponent's board, rebuilt from the rows and piece messages it sends"""
+        self.display_surface = pygame.display.get_surface()
+        self.surface = pygame.Surface((BORDER_WIDTH, BORDER_HEIGHT))
+        self.rect = self.surface.get_rect(topleft = topleft)
+        self.tiles = assets.tiles()
+        self.grid_surface = assets.grid_overlay()
+
+        self.cells = [bytearray(COLUMNS) for _ in range(ROWS)]
+        self.piece = None  # (shape, x, y, rotation state)
+        self.over = False
+        self.changed = True
+
+    def apply(self, kind, payload):
+        if kind == network.ROWS:
+            network.apply_rows(payload, self.cells)
+        elif kind == network.PIECE:
+            shape, x, y, rotation = network.PIECE_FORMAT.unpack(payload)
+            self.piece = None if shape == network.NO_PIECE else (SHAPES[shape], x, y, rotation)
+        elif kind == network.OVER:
+            self.over = True
+        else:
+            return
+        self.changed = True
+
+    def invalidate(self):
+        """Forces a full redraw on the next frame"""
+        self.changed = True
+
+    def run(self):
+        """Draws the board if a message changed it, returns the changed screen rects"""
+        if not self.changed:
+            return []
+        self.changed = False
+
+        self.surface.fill(BLACK)
+        for y, row in enumerate(self.cells):
+            for x, color_index in enumerate(row):
+                if color_index:
+                    self.surface.blit(self.tiles[color_index], (x * CELL_SIZE, y * CELL_SIZE))
+        if self.piece:
+            shape, x, y, rotation = self.piece
+            for dx, dy in ORIENTATIONS[shape][rotation]:
+                if y + dy >= 0:
+                    self.surface.blit(self.tiles[COLOR_INDEX[shape]], ((x + dx) * CELL_SIZE, (y + dy) * CELL_SIZE))
+        self.surface.blit(self.grid_surface, (0, 0))
+        if self.over:
+            text = assets.font(30).render('Game over', True, WHITE)
+            self.surface.blit(text, text.get_rect(center = self.surface.get_rect().center))
+
+        self.display_surface.blit(self.surface, self.rect)
+        pygame.draw.rect(self.display_surface, LINE_COLOR, self.rect, 2, 2)
+        return [self.rect]
+
+
+class VersusMain(Main):
+    def __init__(self, connection, **kwargs):
+        """
+        a normal game plus the opponent's board. Blocks until the server found an opponent.
+        Messages are read on a background thread and handed to the main loop as pygame
+        events, so they also wake it up when it is idle
+        """
+        self.connection = connection
+        seed, player = connection.wait_start()
+        super().__init__(seed = seed, window_size = (WINDOW_WIDTH + BORDER_WIDTH + PADDING, WINDOW_HEIGHT), **kwargs)
+        pygame.display.set_caption(f"Tetris versus (player {player + 1})")
+
+        self.opponent = Opponent((WINDOW_WIDTH, PADDING))
+        self.panels.append(self.opponent)
+        self.game.engine.send_garbage = self.send_garbage
+        self.holes = Random(seed + player)  # where the holes of received garbage are
+
+        # what the opponent has seen of this game
+        self.state_sync = network.StateSync()
+        self.connected = True
+
+        Thread(target = self.receive, daemon = True).start()
+
+    def receive(self):
+        while True:
+            try:
+                message = self.connection.receive()
+            except OSError:
+                message = None
+            pygame.event.post(pygame.event.Event(NETWORK, message = message))
+            if message is None:
+                return
+
+    def send(self, kind, payload = b''):
+        if not self.connected:
+            return
+        try:
+            self.connection.send(kind, payload)
+        except OSError:
+            self.connected = False
+
+    def send_garbage(self, lines):
+        self.send(network.GARBAGE, bytes([lines]))
+
+    def handle_event(self, event):
+        if event.type != NETWORK:
+            return super().handle_event(event)
+        if event.message is None:
+            # the opponent left, that counts as a win
+            self.connected = False
+            self.opponent.apply(network.OVER, b'')
+            return
+        kind, payload = event.message
+        if kind == network.GARBAGE:
+            self.game.engine.receive_garbage(payload[0], self.holes.randrange(COLUMNS))
+        else:
+            self.opponent.apply(kind, payload)
+
+    def update(self):
+        super().update()
+        self.sync()
+
+    def sync(self):
+        """Sends the rows that changed and where the falling piece is now"""
+        for kind, payload in self.state_sync.messages(self.game.engine):
+            self.send(kind, payload)
+
+    def draw_extra(self):
+        return self.opponent.run()
+
+    def quit(self):
+        self.connection.close()
+        super().quit()
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description="Tetris versus")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--serve", action="store_true", help="host the match and play in it")
+    group.add_argument("--connect", metavar="HOST", help="join a match hosted on HOST")
+    parser.add_argument("--port", type=int, default=network.DEFAULT_PORT)
+    parser.add_argument("--das", type=int, default=DAS, help="delayed auto shift in ms")
+    parser.add_argument("--arr", type=int, default=ARR, help="auto repeat rate in ms, 0 moves straight to the wall")
+    args = parser.parse_args()
+
+    host = args.connect
+    if args.serve:
+        server = network.Server('0.0.0.0', args.port)
+        Thread(target = server.serve_match, daemon = True).start()
+        host = '127.0.0.1'
+        print(f"waiting for an opponent on port {args.port}")
+
+    main = VersusMain(network.Connection(host, args.port), das = args.das, arr = args.arr)
+    main.run()